@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pandas as pd
+from type_inference import NULL_TOKENS
+
+# Adaptive mode: validate a column's distinct values on growing stratified samples instead of all of them, and
+# extend the LLM verdicts to the rest of the column with rules learned from them
+ADAPTIVE_VALIDATION = os.getenv('ADAPTIVE_VALIDATION', '0').lower() in ('1', 'true', 'yes')
+
+# Sampling stops once the 95% interval of the column's invalid share (over its distinct values, estimated from the
+# sampled shapes) is at most this wide on either side of its centre, or after ADAPTIVE_MAX_BATCHES batches
+ADAPTIVE_CI_HALF_WIDTH = float(os.getenv('ADAPTIVE_CI_HALF_WIDTH', '0.02'))
+ADAPTIVE_MAX_BATCHES = int(os.getenv('ADAPTIVE_MAX_BATCHES', '16'))
+CONFIDENCE_Z = 1.96
+
+# The learned rules are used only when they agree with the LLM on at least this share of the sampled values;
+# otherwise the rest of the column is validated by the LLM as in the default mode
+RULE_MIN_AGREEMENT = 0.95
+
+
+def shape_codes(shapes):
+    codes, _ = pd.factorize(pd.Series(shapes))
+    return codes, codes.max() + 1 if len(codes) else 0
+
+
+def invalid_share_interval(shapes, checked, invalid_values, z=CONFIDENCE_Z):
+    # Stratified estimate of the invalid share of the checked (sampled, not empty) values, each shape weighted by
+    # its share of all values. Each shape's share is an Agresti-Coull estimate, so shapes with few or no checked
+    # values keep the interval wide
+    # Returns the estimate and the half width of its interval
+    codes, num_shapes = shape_codes(shapes)
+    if not num_shapes:
+        return 0.0, 0.0
+    weights = np.bincount(codes, minlength=num_shapes) / len(codes)
+    trials = np.bincount(codes[checked], minlength=num_shapes) + z ** 2
+    shares = (np.bincount(codes[checked & invalid_values], minlength=num_shapes) + z ** 2 / 2) / trials
+    centre = float((weights * shares).sum())
+    half_width = z * float(np.sqrt((weights ** 2 * shares * (1 - shares) / trials).sum()))
+    return centre, half_width
+
+
+def value_shapes(uniques):
+    # Character-class pattern of each value: runs of digits become 9, runs of letters a, other characters stay
+    # ("12/03/2020" -> "9/9/9", "N/A" -> "a/a"); values of one shape are usually valid or invalid together
+    text = pd.Series(uniques).astype(str).str.strip()
+    return text.str.replace(r'\d+', '9', regex=True).str.replace(r'[^\W\d_]+', 'a', regex=True).to_numpy(dtype=object)
+
+
+def stratified_sample(order, shapes, sampled, size):
+    # Up to size positions not sampled yet, taken round-robin over the shapes (most frequent values first within a
+    # shape, shapes in order of their first value), so rare shapes are reached early
+    remaining = order[~sampled[order]]
+    if len(remaining) <= size:
+        return remaining
+    strata = pd.Series(shapes[remaining])
+    rank = strata.groupby(strata, sort=False).cumcount().to_numpy()
+    stratum = pd.factorize(strata)[0]
+    return remaining[np.lexsort((stratum, rank))[:size]]
+
+
+def parses_as(uniques, data_type):
+    # Values that a parse check accepts as data_type
+    text = pd.Series(uniques).astype(str).str.strip()
+    if data_type in ('float', 'integer'):
+        numbers = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        parsed = np.isfinite(numbers)
+        if data_type == 'integer':
+            parsed &= np.mod(np.where(parsed, numbers, 0), 1) == 0
+        return parsed
+    if data_type == 'date':
+        return pd.to_datetime(text, errors='coerce', format='mixed').notna().to_numpy()
+    return np.ones(len(text), dtype=bool)
+
+
+def learned_rules(uniques, shapes, data_type, learned_from, empty_values, invalid_values):
+    # Empty and invalid flags for every value from rules learned on the verdicts of the learned_from values: a shape
+    # whose values the LLM judged all alike gets that verdict, null tokens are empty, and other values are invalid
+    # when they fail the parse check for data_type
+    codes, num_shapes = shape_codes(shapes)
+    learned_shapes = codes[learned_from]
+    seen = np.bincount(learned_shapes, minlength=num_shapes)
+    empty_seen = np.bincount(learned_shapes, weights=empty_values[learned_from], minlength=num_shapes)
+    invalid_seen = np.bincount(learned_shapes, weights=(invalid_values & ~empty_values)[learned_from], minlength=num_shapes)
+    all_empty = (seen > 0) & (empty_seen == seen)
+    all_invalid = (invalid_seen > 0) & (invalid_seen == seen - empty_seen)
+    all_valid = (seen > 0) & (invalid_seen == 0) & (empty_seen == 0)
+
+    null_token = pd.Series(uniques).astype(str).str.strip().str.lower().isin(NULL_TOKENS).to_numpy()
+    rule_empty = null_token | all_empty[codes]
+    parse_failed = ~parses_as(uniques, data_type)
+    rule_invalid = ~rule_empty & (all_invalid[codes] | (~all_valid[codes] & parse_failed))
+    return rule_empty, rule_invalid
+
+
+def rule_agreement(rule_empty, rule_invalid, checked, empty_values, invalid_values):
+    # Share of the checked values on which the rules give the LLM's verdict
+    if not checked.any():
+        return 0.0
+    agree = (rule_empty == empty_values) & (rule_invalid == (invalid_values & ~empty_values))
+    return float(agree[checked].mean())
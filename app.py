@@ -1,13 +1,42 @@
 import gradio as gr
-import pandas as pd
 from clean import clean_data
-from report import create_full_report, REPORT_DIR
+from stream import clean_csv_streaming
+from report import create_full_report
+from data_io import read_table, write_table, table_format, INPUT_FORMATS, OUTPUT_FORMATS
 import os
 import tempfile
 
-def clean_and_visualize(file, progress=gr.Progress()):
-    # Load the data
-    df = pd.read_csv(file.name)
+def clean_and_visualize_streaming(file, progress=gr.Progress()):
+    # Clean chunk by chunk straight into the output file; the report is drawn from the sample
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
+        cleaned_csv_path = tmp_file.name
+
+    for progress_value, status_text in clean_csv_streaming(file.name, cleaned_csv_path):
+        if isinstance(status_text, tuple):
+            _, sample_df, cleaned_sample_df, nonconforming_cells_before, process_times, removed_columns, removed_rows = status_text
+            progress(progress_value, desc="Cleaning completed")
+        else:
+            progress(progress_value, desc=status_text)
+
+    image_files = create_full_report(
+        sample_df,
+        cleaned_sample_df,
+        nonconforming_cells_before,
+        process_times,
+        removed_columns,
+        removed_rows
+    )
+
+    return cleaned_csv_path, image_files
+
+
+def clean_and_visualize(file, progress=gr.Progress(), streaming=False, output_format='csv'):
+    # Streaming reads CSV in chunks; columnar files are loaded whole
+    if streaming and table_format(file.name) == 'csv':
+        return clean_and_visualize_streaming(file, progress=progress)
+
+    # Load the data (CSV, Parquet, Feather or Arrow)
+    df = read_table(file.name)
     
     # Clean the data
     cleaned_df = None
@@ -16,7 +45,8 @@ def clean_and_visualize(file, progress=gr.Progress()):
     removed_columns = None
     removed_rows = None
     
-    for progress_value, status_text in clean_data(df):
+    # Set CHECKPOINT_DIR to make runs resumable after a crash or restart
+    for progress_value, status_text in clean_data(df, checkpoint_dir=os.getenv('CHECKPOINT_DIR')):
         if isinstance(status_text, tuple):
             cleaned_df, nonconforming_cells_before, process_times, removed_columns, removed_rows = status_text
             progress(progress_value, desc="Cleaning completed")
@@ -24,7 +54,7 @@ def clean_and_visualize(file, progress=gr.Progress()):
             progress(progress_value, desc=status_text)
     
     # Generate full visualization report
-    create_full_report(
+    image_files = create_full_report(
         df,
         cleaned_df,
         nonconforming_cells_before,
@@ -33,13 +63,9 @@ def clean_and_visualize(file, progress=gr.Progress()):
         removed_rows
     )
     
-    # Save cleaned DataFrame to a temporary CSV file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-        cleaned_df.to_csv(tmp_file.name, index=False)
-        cleaned_csv_path = tmp_file.name
-    
-    # Collect all generated images
-    image_files = [os.path.join(REPORT_DIR, f) for f in os.listdir(REPORT_DIR) if f.endswith('.png')]
+    # Save cleaned DataFrame to a temporary file; Parquet, Feather and Arrow keep the cleaned dtypes
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{output_format}') as tmp_file:
+        cleaned_csv_path = write_table(cleaned_df, tmp_file.name, output_format)
     
     return cleaned_csv_path, image_files
 
@@ -48,8 +74,12 @@ def launch_app():
         gr.Markdown("# AI Data Cleaner")
         
         with gr.Row():
-            file_input = gr.File(label="Upload CSV File", file_count="single", file_types=[".csv"])
+            file_input = gr.File(label="Upload Data File", file_count="single", file_types=INPUT_FORMATS)
         
+        with gr.Row():
+            streaming_input = gr.Checkbox(label="Streaming mode (for files larger than memory)", value=False)
+            output_format_input = gr.Dropdown(label="Output format", choices=OUTPUT_FORMATS, value="csv")
+
         with gr.Row():
             clean_button = gr.Button("Start Cleaning")
         
@@ -57,7 +87,7 @@ def launch_app():
             progress_bar = gr.Progress()
         
         with gr.Row():
-            cleaned_file_output = gr.File(label="Cleaned CSV", visible=True)
+            cleaned_file_output = gr.File(label="Cleaned Data", visible=True)
         
         with gr.Row():
             output_gallery = gr.Gallery(
@@ -71,8 +101,9 @@ def launch_app():
                 visible=False  # Initially set to invisible
             )
         
-        def process_and_show_results(file):
-            cleaned_csv_path, image_files = clean_and_visualize(file, progress=progress_bar)
+        def process_and_show_results(file, streaming, output_format):
+            cleaned_csv_path, image_files = clean_and_visualize(file, progress=progress_bar, streaming=streaming,
+                                                                output_format=output_format)
             return (
                 cleaned_csv_path,
                 gr.Gallery(visible=True, value=image_files)  # Make gallery visible and update its content
@@ -80,7 +111,7 @@ def launch_app():
         
         clean_button.click(
             fn=process_and_show_results,
-            inputs=file_input,
+            inputs=[file_input, streaming_input, output_format_input],
             outputs=[cleaned_file_output, output_gallery]
         )
     
@@ -0,0 +1,437 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Benchmarks run offline against the mock LLM, without the response cache, unless told otherwise
+os.environ.setdefault('LLM_BACKEND', 'mock')
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+
+import clean
+import llm_config
+from llm_backends import MockBackend
+from clean import clean_data, remove_outliers, transform_string_column, transform_strings
+from report import create_full_report
+from data_io import read_table, write_table
+
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Regression thresholds: relative slowdown / memory growth, with absolute floors below which differences are noise
+TIME_TOLERANCE = 0.25
+MIN_SECONDS_DELTA = 0.1
+MEMORY_TOLERANCE = 0.20
+MIN_MEMORY_DELTA_MB = 20
+
+SCENARIOS = {
+    'narrow': {'rows': 10000, 'columns': 6, 'cardinality': 20, 'null_rate': 0.05},
+    'wide': {'rows': 5000, 'columns': 40, 'cardinality': 20, 'null_rate': 0.05},
+    'high_cardinality': {'rows': 20000, 'columns': 6, 'cardinality': 5000, 'null_rate': 0.05},
+    'sparse': {'rows': 20000, 'columns': 8, 'cardinality': 50, 'null_rate': 0.4},
+    'tall': {'rows': 200000, 'columns': 8, 'cardinality': 100, 'null_rate': 0.05}
+}
+QUICK_SCENARIOS = ['narrow', 'high_cardinality', 'sparse']
+
+# clean_data status messages, mapped to the stage that finished when they are yielded
+STAGE_STATUSES = {
+    'Normalized headers': 'Normalize headers',
+    'Removed empty columns': 'Remove empty columns',
+    'Removed empty rows': 'Remove empty rows',
+    'Removed low count strings': 'Remove low count strings'
+}
+
+
+def make_dirty_dataset(rows, columns, cardinality, null_rate, seed=42):
+    # Synthetic data with the problems the pipeline cleans: numbers stored as text with junk values, inconsistent
+    # category spellings, rare values, mixed date formats, outliers, mostly empty columns and empty rows
+    rng = np.random.default_rng(seed)
+    categories = np.array([f"Category {i}" for i in range(cardinality)])
+    data = {}
+    for i in range(columns):
+        kind = i % 5
+        if kind == 0:
+            values = rng.normal(100, 15, rows).round(2)
+            values[rng.random(rows) < 0.01] *= 20
+            column = values.astype(str).astype(object)
+            column[rng.random(rows) < 0.01] = rng.choice(['n/a', 'unknown', '-', 'error'], 1)[0]
+            data[f"Measure {i}"] = column
+        elif kind == 1:
+            data[f"Count {i}"] = rng.integers(0, 1000, rows).astype(float)
+        elif kind == 2:
+            column = rng.choice(categories, rows).astype(object)
+            variants = rng.random(rows)
+            column[variants < 0.05] = np.char.upper(column[variants < 0.05].astype(str))
+            column[variants > 0.995] = [f"rare {j}" for j in range((variants > 0.995).sum())]
+            data[f"Label {i}"] = column
+        elif kind == 3:
+            dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3000, rows), unit='D')
+            column = dates.strftime('%Y-%m-%d').to_numpy(dtype=object)
+            other_format = rng.random(rows) < 0.05
+            column[other_format] = dates[other_format].strftime('%d/%m/%Y')
+            data[f"Date {i}"] = column
+        else:
+            column = rng.normal(0, 1, rows)
+            column[rng.random(rows) < 0.7] = np.nan
+            data[f"Mostly empty {i}"] = column
+
+    df = pd.DataFrame(data)
+    df = df.mask(rng.random(df.shape) < null_rate)
+    df.iloc[rng.random(rows) < 0.01] = np.nan
+    return df
+
+
+class PeakRSSSampler:
+    # Peak resident set size since the last reset, sampled from /proc; falls back to the process-lifetime peak
+    # (ru_maxrss) where /proc is not available
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        self._use_proc = os.path.exists('/proc/self/statm')
+        self._peak = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _current(self):
+        if self._use_proc:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * self._page_size
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        current = self._current()
+        with self._lock:
+            self._peak = max(self._peak, current)
+
+    def reset(self):
+        # Returns the peak (MB) since the previous reset
+        self.sample()
+        with self._lock:
+            peak, self._peak = self._peak, self._current()
+        return peak / 2 ** 20
+
+    def __enter__(self):
+        self._peak = self._current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _stage_name(status):
+    if isinstance(status, tuple):
+        return 'Remove outliers'
+    if 'olumn: ' in status:
+        return 'Clean columns'
+    return STAGE_STATUSES.get(status, status)
+
+
+def run_scenario(name, rows, columns, cardinality, null_rate, llm_latency=0.0, report=True, seed=42):
+    df = make_dirty_dataset(rows, columns, cardinality, null_rate, seed)
+    backend = MockBackend(latency_seconds=llm_latency)
+    llm_config.set_backend(backend)
+
+    stages = {}
+
+    def record(stage, seconds, peak_rss_mb, llm_calls):
+        totals = stages.setdefault(stage, {'seconds': 0.0, 'peak_rss_mb': 0.0, 'llm_calls': 0})
+        totals['seconds'] += seconds
+        totals['peak_rss_mb'] = max(totals['peak_rss_mb'], peak_rss_mb)
+        totals['llm_calls'] += llm_calls
+
+    print(f"Benchmark {name}: {rows} rows x {columns} columns, cardinality {cardinality}, null rate {null_rate}")
+    with PeakRSSSampler() as sampler:
+        sampler.reset()
+        calls = backend.requests
+        start_time = time.perf_counter()
+        result = None
+        for _, status in clean_data(df.copy()):
+            now = time.perf_counter()
+            record(_stage_name(status), now - start_time, sampler.reset(), backend.requests - calls)
+            if isinstance(status, tuple):
+                result = status
+            calls = backend.requests
+            start_time = time.perf_counter()
+        cleaned_df, nonconforming_cells_before, process_times, removed_columns, removed_rows = result
+
+        # remove_outliers on its own, so its cost is measured without the rest of the pipeline
+        start_time = time.perf_counter()
+        remove_outliers(cleaned_df)
+        record('Remove outliers (standalone)', time.perf_counter() - start_time, sampler.reset(), 0)
+
+        if report:
+            start_time = time.perf_counter()
+            create_full_report(df, cleaned_df, nonconforming_cells_before, process_times, removed_columns,
+                               removed_rows, report_dir=os.path.join('benchmark_reports', name))
+            record('Report', time.perf_counter() - start_time, sampler.reset(), 0)
+
+    return {
+        'shape': {'rows': rows, 'columns': columns, 'cardinality': cardinality, 'null_rate': null_rate},
+        'stages': stages,
+        'total_seconds': sum(stage['seconds'] for stage in stages.values()),
+        'llm_calls': backend.requests,
+        'rows_after': len(cleaned_df)
+    }
+
+
+def run_memory_profile(name, rows, columns, cardinality, null_rate, seed=42):
+    # Peak memory allocated during each stage of clean_data on top of what was allocated before it started, traced
+    # with tracemalloc (which sees NumPy and pandas buffers), relative to the size of the input frame
+    df = make_dirty_dataset(rows, columns, cardinality, null_rate, seed)
+    input_mb = df.memory_usage(deep=True).sum() / 2 ** 20
+    llm_config.set_backend(MockBackend())
+    stages = {}
+    print(f"Memory profile {name}: {rows} rows x {columns} columns, input {input_mb:.1f} MB")
+    tracemalloc.start()
+    try:
+        start_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        for _, status in clean_data(df):
+            stage = _stage_name(status)
+            stages[stage] = max(stages.get(stage, 0.0), tracemalloc.get_traced_memory()[1] / 2 ** 20 - start_mb)
+            tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+    for stage, peak_mb in stages.items():
+        print(f"  {stage:<32} {peak_mb:>8.1f} MB above input  ({peak_mb / input_mb:.2f}x input)")
+    return {'input_mb': input_mb, 'stages': {stage: {'peak_mb': peak_mb, 'input_ratio': peak_mb / input_mb}
+                                             for stage, peak_mb in stages.items()}}
+
+
+def run_string_normalization_benchmark(cardinalities=(100, 1000, 5000), llm_latency=0.0, seed=42):
+    # Local string normalization against the LLM transform it replaces, on the unique values of a label column:
+    # seconds, LLM calls and the share of values both paths transform alike
+    rng = np.random.default_rng(seed)
+    results = {}
+    for cardinality in cardinalities:
+        labels = np.array([f"Category {i}" for i in range(cardinality)], dtype=object)
+        variants = rng.random(cardinality)
+        labels[variants < 0.2] = np.char.upper(labels[variants < 0.2].astype(str))
+        labels[(variants >= 0.2) & (variants < 0.3)] = [f"  {label} " for label in labels[(variants >= 0.2) & (variants < 0.3)]]
+        labels[variants > 0.98] = 'NaN'
+        uniques = pd.Series(pd.unique(labels))
+
+        start_time = time.perf_counter()
+        local = transform_strings(uniques, {}, normalize=True)
+        local_seconds = time.perf_counter() - start_time
+
+        backend = MockBackend(latency_seconds=llm_latency)
+        llm_config.set_backend(backend)
+        start_time = time.perf_counter()
+        llm = transform_strings(uniques, transform_string_column(uniques, 'label'))
+        llm_seconds = time.perf_counter() - start_time
+
+        agree = (local == llm) | (local.isna() & llm.isna())
+        results[cardinality] = {'local_seconds': local_seconds, 'llm_seconds': llm_seconds,
+                                'llm_calls': backend.requests, 'agreement': float(agree.mean())}
+        print(f"  {cardinality:>6} unique values: local {local_seconds:.4f}s, LLM {llm_seconds:.4f}s "
+              f"({backend.requests} calls), {agree.mean():.1%} alike")
+    return results
+
+
+def frames_match(a, b):
+    # Equal values, dtypes and kinds of missing value (None and NaN compare equal in DataFrame.equals)
+    if not a.equals(b) or not a.dtypes.equals(b.dtypes):
+        return False
+    return all(a[column].map(type).equals(b[column].map(type)) for column in a.columns if a[column].dtype == object)
+
+
+def run_worker_check(name, rows, columns, cardinality, null_rate, seed=42):
+    # Cleans an Arrow-backed frame (as read_table returns it) in this process and through the column workers, whose
+    # columns travel in shared memory, and reports whether both give the same frame
+    df = make_dirty_dataset(rows, columns, cardinality, null_rate, seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{name}.parquet")
+        write_table(df, path)
+        df = read_table(path, arrow_dtypes=True)
+    llm_config.set_backend(MockBackend())
+    results = {}
+    workers = clean.COLUMN_WORKERS
+    try:
+        for clean.COLUMN_WORKERS in (1, 2):
+            results[clean.COLUMN_WORKERS] = [result for _, result in clean_data(df)][-1][0]
+    finally:
+        clean.COLUMN_WORKERS = workers
+    same = frames_match(results[1], results[2])
+    print(f"  {name}: {rows} rows x {columns} columns, worker result {'matches' if same else 'DIFFERS FROM'} "
+          f"the in-process result")
+    return same
+
+
+def run_resume_check(name, rows, columns, cardinality, null_rate, seed=42, stops=(2, 4, 6)):
+    # Interrupts clean_data after each of the given progress updates and resumes it from its checkpoint, on input
+    # read from a CSV file with NumPy and with Arrow dtypes, and reports whether every resumed run gives the frame
+    # of an uninterrupted run
+    df = make_dirty_dataset(rows, columns, cardinality, null_rate, seed)
+    llm_config.set_backend(MockBackend())
+    same = True
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{name}.csv")
+        write_table(df, path)
+        for arrow_dtypes in (False, True):
+            df = read_table(path, arrow_dtypes=arrow_dtypes)
+            expected = [result for _, result in clean_data(df)][-1][0]
+            for stop in stops:
+                checkpoint_dir = os.path.join(directory, 'checkpoints')
+                shutil.rmtree(checkpoint_dir, ignore_errors=True)
+                for update, _ in enumerate(clean_data(df, checkpoint_dir=checkpoint_dir)):
+                    if update == stop:
+                        break
+                resumed = [result for _, result in clean_data(df, checkpoint_dir=checkpoint_dir)][-1][0]
+                matches = frames_match(resumed, expected)
+                same &= matches
+                print(f"  {name}, {'Arrow' if arrow_dtypes else 'NumPy'} dtypes, stopped after update {stop}: resumed "
+                      f"result {'matches' if matches else 'DIFFERS FROM'} the uninterrupted result")
+    return same
+
+
+def run_benchmarks(scenario_names, repeat=1, llm_latency=0.0, report=True):
+    # Each scenario runs `repeat` times; times are the median run, memory and LLM calls the maximum
+    results = {}
+    for name in scenario_names:
+        runs = [run_scenario(name, **SCENARIOS[name], llm_latency=llm_latency, report=report) for _ in range(repeat)]
+        result = runs[0]
+        for stage in result['stages']:
+            result['stages'][stage] = {
+                'seconds': float(np.median([run['stages'][stage]['seconds'] for run in runs])),
+                'peak_rss_mb': max(run['stages'][stage]['peak_rss_mb'] for run in runs),
+                'llm_calls': max(run['stages'][stage]['llm_calls'] for run in runs)
+            }
+        result['total_seconds'] = float(np.median([run['total_seconds'] for run in runs]))
+        results[name] = result
+    return {
+        'created_at': time.time(),
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'llm_backend': 'mock',
+            'llm_latency': llm_latency,
+            'repeat': repeat
+        },
+        'scenarios': results
+    }
+
+
+def compare_to_baseline(results, baseline):
+    # Returns a list of regressions: stages that got slower, used more memory or made more LLM calls
+    regressions = []
+    for name, result in results['scenarios'].items():
+        baseline_stages = baseline.get('scenarios', {}).get(name, {}).get('stages', {})
+        for stage, current in result['stages'].items():
+            previous = baseline_stages.get(stage)
+            if previous is None:
+                continue
+            seconds_delta = current['seconds'] - previous['seconds']
+            if seconds_delta > MIN_SECONDS_DELTA and current['seconds'] > previous['seconds'] * (1 + TIME_TOLERANCE):
+                regressions.append({'scenario': name, 'stage': stage, 'metric': 'seconds',
+                                    'baseline': previous['seconds'], 'current': current['seconds']})
+            memory_delta = current['peak_rss_mb'] - previous['peak_rss_mb']
+            if memory_delta > MIN_MEMORY_DELTA_MB and current['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + MEMORY_TOLERANCE):
+                regressions.append({'scenario': name, 'stage': stage, 'metric': 'peak_rss_mb',
+                                    'baseline': previous['peak_rss_mb'], 'current': current['peak_rss_mb']})
+            if current['llm_calls'] > previous['llm_calls']:
+                regressions.append({'scenario': name, 'stage': stage, 'metric': 'llm_calls',
+                                    'baseline': previous['llm_calls'], 'current': current['llm_calls']})
+    return regressions
+
+
+def print_results(results, baseline=None):
+    for name, result in results['scenarios'].items():
+        baseline_stages = (baseline or {}).get('scenarios', {}).get(name, {}).get('stages', {})
+        print(f"\n{name} ({result['shape']['rows']} x {result['shape']['columns']}): "
+              f"{result['total_seconds']:.2f}s, {result['llm_calls']} LLM calls")
+        for stage, current in result['stages'].items():
+            line = f"  {stage:<32} {current['seconds']:>8.3f}s {current['peak_rss_mb']:>8.1f} MB {current['llm_calls']:>6} calls"
+            previous = baseline_stages.get(stage)
+            if previous is not None and previous['seconds'] > 0:
+                line += f"  ({current['seconds'] / previous['seconds'] - 1:+.0%} vs baseline)"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cleaning pipeline against a mocked LLM.")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument('--quick', action='store_true', help=f"Run only {', '.join(QUICK_SCENARIOS)}")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per scenario; times are the median")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Mock LLM latency per request (seconds)")
+    parser.add_argument('--no-report', dest='report', action='store_false', help="Skip the report stage")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--memory-profile', action='store_true',
+                        help="Only trace the peak memory of each clean_data stage against the input size")
+    parser.add_argument('--string-normalization', action='store_true',
+                        help="Only compare local string normalization with the LLM transform")
+    parser.add_argument('--worker-check', action='store_true',
+                        help="Only check that the column workers clean Arrow-backed input like this process does")
+    parser.add_argument('--resume-check', action='store_true',
+                        help="Only check that runs resumed from a checkpoint give the result of uninterrupted runs")
+    args = parser.parse_args(argv)
+
+    if args.memory_profile:
+        for name in args.scenarios or (QUICK_SCENARIOS if args.quick else list(SCENARIOS)):
+            run_memory_profile(name, **SCENARIOS[name])
+        return 0
+
+    if args.worker_check:
+        print("Column workers on Arrow-backed input:")
+        results = [run_worker_check(name, **SCENARIOS[name]) for name in args.scenarios or QUICK_SCENARIOS]
+        return 0 if all(results) else 1
+
+    if args.resume_check:
+        print("Runs resumed from a checkpoint:")
+        results = [run_resume_check(name, **SCENARIOS[name]) for name in args.scenarios or QUICK_SCENARIOS]
+        return 0 if all(results) else 1
+
+    if args.string_normalization:
+        print("String normalization, local vs LLM:")
+        run_string_normalization_benchmark(llm_latency=args.llm_latency)
+        return 0
+
+    scenario_names = args.scenarios or (QUICK_SCENARIOS if args.quick else list(SCENARIOS))
+    results = run_benchmarks(scenario_names, repeat=args.repeat, llm_latency=args.llm_latency, report=args.report)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    results['regressions'] = compare_to_baseline(results, baseline) if baseline else []
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif results['regressions']:
+        print(f"\n{len(results['regressions'])} regressions against {args.baseline}:")
+        for regression in results['regressions']:
+            print(f"  {regression['scenario']} / {regression['stage']}: {regression['metric']} "
+                  f"{regression['baseline']:.3f} -> {regression['current']:.3f}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', 'checkpoints')
+
+
+def frame_fingerprint(df):
+    # Content hash of the input frame: column names, dtypes and every value
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in df.columns]).encode('utf-8'))
+    digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _write_frame(df, path):
+    # Parquet when the frame allows it (needs pyarrow, string column names, single-typed columns), pickle otherwise
+    try:
+        df.to_parquet(path + '.parquet')
+        return path + '.parquet'
+    except Exception:
+        df.to_pickle(path + '.pkl')
+        return path + '.pkl'
+
+
+def _read_frame(path):
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        # Parquet hands missing values in object columns back as None, where an uninterrupted run has NaN, and
+        # Arrow-backed columns back as nullable ones
+        for column in df.columns[df.dtypes == object]:
+            df[column] = df[column].where(df[column].notna(), np.nan)
+        schema = pq.read_schema(path)
+        for field in (schema.pandas_metadata or {}).get('columns', []):
+            column = field['name']
+            if (column in df.columns and str(field['numpy_type']).endswith('[pyarrow]')
+                    and not isinstance(df[column].dtype, pd.ArrowDtype)):
+                df[column] = df[column].astype(pd.ArrowDtype(schema.field(field['field_name']).type))
+        return df
+    return pd.read_pickle(path)
+
+
+class RunCheckpoint:
+    # Run manifest, latest intermediate frame, per-column results and a journal of column decisions for one input
+
+    def __init__(self, root, fingerprint):
+        self.fingerprint = fingerprint
+        self.run_dir = os.path.join(root, fingerprint[:16])
+        self.manifest_path = os.path.join(self.run_dir, 'manifest.json')
+        self.journal_path = os.path.join(self.run_dir, 'journal.jsonl')
+        os.makedirs(os.path.join(self.run_dir, 'columns'), exist_ok=True)
+
+        self.manifest = None
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('fingerprint') == fingerprint:
+                self.manifest = manifest
+        if self.manifest is None:
+            self.manifest = {
+                'fingerprint': fingerprint,
+                'created_at': time.time(),
+                'status': 'running',
+                'completed_steps': [],
+                'completed_columns': {},
+                'frame': None,
+                'columns_after_headers': None,
+                'nonconforming_cells_before': None,
+                'process_times': {}
+            }
+            self._write_manifest()
+        self._decisions = self._read_journal()
+
+    @classmethod
+    def for_frame(cls, df, root=CHECKPOINT_DIR):
+        return cls(root, frame_fingerprint(df))
+
+    @property
+    def resumed(self):
+        return bool(self.manifest['completed_steps'] or self.manifest['completed_columns'])
+
+    def _write_manifest(self):
+        self.manifest['updated_at'] = time.time()
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, default=_json_default)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _read_journal(self):
+        decisions = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    decisions[record['column']] = record['decisions']
+        return decisions
+
+    def is_done(self, step):
+        return step in self.manifest['completed_steps']
+
+    def save_step(self, step, df, process_times):
+        # Only the latest frame is kept; each completed step replaces the previous one
+        previous = self.manifest['frame']
+        self.manifest['frame'] = _write_frame(df, os.path.join(self.run_dir, 'frame_' + str(len(self.manifest['completed_steps']))))
+        self.manifest['completed_steps'].append(step)
+        self.manifest['process_times'] = dict(process_times)
+        self._write_manifest()
+        if previous and previous != self.manifest['frame'] and os.path.exists(previous):
+            os.remove(previous)
+
+    def load_frame(self):
+        return _read_frame(self.manifest['frame'])
+
+    def save_metadata(self, **values):
+        self.manifest.update(values)
+        self._write_manifest()
+
+    def column_decisions(self, column):
+        return self._decisions.get(column)
+
+    def record_decisions(self, column, decisions):
+        self._decisions[column] = decisions
+        line = json.dumps({'column': column, 'decisions': decisions, 'recorded_at': time.time()}, default=_json_default)
+        with open(self.journal_path, 'a') as f:
+            f.write(line + '\n')
+
+    def save_column(self, column, series, seconds):
+        position = len(self.manifest['completed_columns'])
+        path = _write_frame(series.to_frame(), os.path.join(self.run_dir, 'columns', str(position)))
+        self.manifest['completed_columns'][column] = {'path': path, 'seconds': seconds}
+        self._write_manifest()
+
+    def completed_columns(self):
+        return list(self.manifest['completed_columns'])
+
+    def load_column(self, column):
+        return _read_frame(self.manifest['completed_columns'][column]['path']).iloc[:, 0]
+
+    def complete(self):
+        self.manifest['status'] = 'complete'
+        self._write_manifest()
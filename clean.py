@@ -1,21 +1,90 @@
 import pandas as pd
 import numpy as np
 import json
+import os
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
-from llm_config import generate_llm_response
+import llm_config
+import metrics
+from llm_config import (generate_llm_response, generate_llm_responses, discard_llm_response, cache_stats, estimate_tokens,
+                        set_max_concurrency)
+from value_index import ColumnIndex, factorize_column, values_by_frequency, valid_positions
+from checkpoint import RunCheckpoint
+from prompt_builder import split_prompts
+from typo_clustering import cluster_values
+from string_normalization import normalize_strings
+from dtype_optimizer import optimize_dtypes
+from frame_selection import FrameSelection
+from adaptive_validation import (
+    ADAPTIVE_VALIDATION,
+    ADAPTIVE_CI_HALF_WIDTH,
+    ADAPTIVE_MAX_BATCHES,
+    RULE_MIN_AGREEMENT,
+    invalid_share_interval,
+    value_shapes,
+    stratified_sample,
+    learned_rules,
+    rule_agreement
+)
+from cleaning_plan import CleaningPlan
+from data_io import string_columns
+from profiler import profile_frame, nonconforming_counts, rename_profile, remove_rows_from_counts
+from shared_frames import (share_frame, open_shared_frame, close_shared_frame, release_shared_frame, frame_to_bytes,
+                           frame_from_bytes)
+from type_inference import (
+    infer_column_type,
+    record_inference,
+    reset_inference_stats,
+    merge_inference_stats,
+    print_inference_report,
+    inference_stats
+)
 from llm_prompts import (
     CHECK_HEADERS_PROMPT,
     NORMALIZE_HEADERS_PROMPT,
     CHECK_COLUMN_CONTENT_PROMPT,
-    CHECK_TYPOS_PROMPT,
+    CHECK_TYPED_COLUMN_CONTENT_PROMPT,
+    CHECK_PACKED_COLUMN_CONTENT_PROMPT,
+    CHECK_TYPO_CLUSTERS_PROMPT,
     TRANSFORM_STRING_PROMPT,
+    REWRITE_STRING_PROMPT,
     CHECK_LOW_COUNT_VALUES_PROMPT
 )
 
 BATCH_SIZE = 50
 EMPTY_THRESHOLD = 0.5
 
+# Worker processes for cleaning columns in parallel (1 cleans them one after another in this process)
+COLUMN_WORKERS = int(os.getenv('COLUMN_WORKERS', '1'))
+
+# Packing mode: fill each LLM request with batches from several columns, up to a prompt token budget
+PACK_COLUMN_BATCHES = False
+PACK_TOKEN_BUDGET = 3000
+
+# String columns with more distinct values than this, or (past CATEGORICAL_MIN_VALUES) with more distinct values
+# per filled row than CATEGORICAL_MAX_RATIO, are not categorical: the transform, low count and typo prompts skip them
+CATEGORICAL_MAX_VALUES = 5000
+CATEGORICAL_MIN_VALUES = 50
+CATEGORICAL_MAX_RATIO = 0.5
+NAN_STRINGS = {"nan": np.nan, "NaN": np.nan, "NAN": np.nan}
+
+# How string values are made consistent: 'local' (Unicode NFKC, case folding, whitespace and null tokens, see
+# string_normalization), 'local+llm' (local, then the LLM for semantic rewrites such as abbreviations) or 'llm'
+# (the LLM lowercases every unique value)
+STRING_NORMALIZATION = os.getenv('STRING_NORMALIZATION', 'local')
+
+# Store the cleaned frame in compact dtypes (narrower numbers, category and Arrow strings) as a last step
+OPTIMIZE_DTYPES = os.getenv('OPTIMIZE_DTYPES', '0').lower() in ('1', 'true', 'yes')
+
+# Outlier fences: 'iqr' (quartiles -/+ multiplier * IQR), 'zscore' (mean -/+ threshold * std) or 'mad' (modified z-score)
+OUTLIER_METHOD = 'iqr'
+IQR_MULTIPLIER = 1.5
+ZSCORE_THRESHOLD = 3.0
+MAD_THRESHOLD = 3.5
+OUTLIER_THRESHOLDS = {'iqr': IQR_MULTIPLIER, 'zscore': ZSCORE_THRESHOLD, 'mad': MAD_THRESHOLD}
+
 
 def print_dataframe_info(df, step=""):
     num_columns = df.shape[1]
@@ -30,32 +99,50 @@ def print_dataframe_info(df, step=""):
 def check_and_normalize_column_headers(df):
     print("Checking and normalizing column headers...")
 
-    check_prompt = CHECK_HEADERS_PROMPT.format(columns=df.columns.tolist())
-    check_response = generate_llm_response(check_prompt)
-    try:
-        invalid_columns = json.loads(check_response)
-        if invalid_columns:
-            print(f"Columns with invalid names (indices): {invalid_columns}")
-            for idx in invalid_columns:
-                new_name = f"column_{idx}"
-                print(f"Renaming column at index {idx} to '{new_name}'")
-                df.rename(columns={df.columns[idx]: new_name}, inplace=True)
-        else:
-            print("All column headers are valid or no invalid headers detected.")
-    except json.JSONDecodeError:
-        print("Error parsing LLM response for column headers check.")
+    # Wide frames send their column names in several requests; indices come back relative to each request's part
+    check_prompts = split_prompts(CHECK_HEADERS_PROMPT, 'columns', df.columns.tolist())
+    if check_prompts is None:
+        print(f"Too many columns ({len(df.columns)}) to check the headers with the LLM, skipped")
+        metrics.increment('llm_stages_skipped_total', reason='too_many_requests')
+        check_prompts = []
+    invalid_columns = []
+    check_responses = generate_llm_responses([prompt for _, prompt in check_prompts])
+    for (offset, prompt), check_response in zip(check_prompts, check_responses):
+        try:
+            invalid_columns.extend(offset + idx for idx in json.loads(check_response)
+                                   if isinstance(idx, int) and 0 <= offset + idx < len(df.columns))
+        except (json.JSONDecodeError, TypeError):
+            discard_llm_response(prompt)
+            metrics.increment('llm_parse_failures_total', prompt='check_headers')
+            print("Error parsing LLM response for column headers check.")
+    if invalid_columns:
+        print(f"Columns with invalid names (indices): {invalid_columns}")
+        for idx in invalid_columns:
+            new_name = f"column_{idx}"
+            print(f"Renaming column at index {idx} to '{new_name}'")
+            df.rename(columns={df.columns[idx]: new_name}, inplace=True)
+    else:
+        print("All column headers are valid or no invalid headers detected.")
 
-    normalize_prompt = NORMALIZE_HEADERS_PROMPT.format(columns=df.columns.tolist())
-    normalize_response = generate_llm_response(normalize_prompt)
-    try:
-        normalized_names = json.loads(normalize_response)
-        if normalized_names:
-            df.rename(columns=normalized_names, inplace=True)
-            print("Column names have been normalized.")
-        else:
-            print("No column names were normalized. Proceeding with current names.")
-    except json.JSONDecodeError:
-        print("Error parsing LLM response for column name normalization.")
+    normalize_prompts = split_prompts(NORMALIZE_HEADERS_PROMPT, 'columns', df.columns.tolist())
+    if normalize_prompts is None:
+        print(f"Too many columns ({len(df.columns)}) to normalize the headers with the LLM, skipped")
+        metrics.increment('llm_stages_skipped_total', reason='too_many_requests')
+        normalize_prompts = []
+    normalized_names = {}
+    normalize_responses = generate_llm_responses([prompt for _, prompt in normalize_prompts])
+    for (_, prompt), normalize_response in zip(normalize_prompts, normalize_responses):
+        try:
+            normalized_names.update(json.loads(normalize_response))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            discard_llm_response(prompt)
+            metrics.increment('llm_parse_failures_total', prompt='normalize_headers')
+            print("Error parsing LLM response for column name normalization.")
+    if normalized_names:
+        df.rename(columns=normalized_names, inplace=True)
+        print("Column names have been normalized.")
+    else:
+        print("No column names were normalized. Proceeding with current names.")
 
     # Fallback normalization
     df.columns = [col.lower().replace(' ', '_') for col in df.columns]
@@ -64,179 +151,700 @@ def check_and_normalize_column_headers(df):
     return df
 
 
-def process_column_batch(column_data, column_name):
-    sample = column_data.sample(n=min(BATCH_SIZE, len(column_data)), random_state=42).tolist()
-    prompt = CHECK_COLUMN_CONTENT_PROMPT.format(column_name=column_name, sample_values=str(sample))
-    response = generate_llm_response(prompt)
+def build_column_batch_prompt(column_data, column_name, data_type=None):
+    # Values are sent in order so the returned indices line up with the batch; with data_type the LLM only checks
+    # the values against it
+    sample = column_data.tolist()
+    if data_type is not None:
+        return CHECK_TYPED_COLUMN_CONTENT_PROMPT.format(column_name=column_name, data_type=data_type,
+                                                       sample_values=str(sample))
+    return CHECK_COLUMN_CONTENT_PROMPT.format(column_name=column_name, sample_values=str(sample))
+
+
+def parse_column_batch_response(response, column_name, data_type=None, prompt=None):
     try:
         result = json.loads(response)
-        if not all(key in result for key in ['data_type', 'empty_indices', 'invalid_indices']):
+        required = ['empty_indices', 'invalid_indices'] + (['data_type'] if data_type is None else [])
+        if not all(key in result for key in required):
             raise ValueError("Missing required keys in LLM response")
+        if data_type is not None:
+            result['data_type'] = data_type
         return result
-    except (json.JSONDecodeError, ValueError) as e:
+    except (json.JSONDecodeError, ValueError, TypeError) as e:
+        if prompt is not None:
+            discard_llm_response(prompt)
+        metrics.increment('llm_parse_failures_total', prompt='column_content')
         print(f"Error parsing LLM response for column {column_name}: {str(e)}")
         print(f"LLM Response: {response}")
-        return {'data_type': 'string', 'empty_indices': [], 'invalid_indices': []}
+        return {'data_type': data_type or 'string', 'empty_indices': [], 'invalid_indices': []}
 
 
-def check_typos(column_data, column_name):
-    sample = column_data.sample(n=min(BATCH_SIZE, len(column_data)), random_state=42).tolist()
-    prompt = CHECK_TYPOS_PROMPT.format(column_name=column_name, sample_values=str(sample))
-    response = generate_llm_response(prompt)
-    try:
-        return json.loads(response)
-    except json.JSONDecodeError:
-        print(f"Error parsing LLM response for typo check in column {column_name}")
-        return {"typos": {}}
+def process_column_batch(column_data, column_name):
+    prompt = build_column_batch_prompt(column_data, column_name)
+    return parse_column_batch_response(generate_llm_response(prompt), column_name, prompt=prompt)
 
 
-def transform_string_column(column_data, column_name):
+def process_column_batches(batches, column_name, data_type=None):
+    # Batches are validated concurrently; results come back in batch order
+    prompts = [build_column_batch_prompt(batch, column_name, data_type) for batch in batches]
+    responses = generate_llm_responses(prompts)
+    return [parse_column_batch_response(response, column_name, data_type, prompt)
+            for prompt, response in zip(prompts, responses)]
+
+
+def resolve_typos(typos):
+    # Follow chains of corrections (a -> b -> c) to their end; corrections that lead back to themselves are dropped
+    resolved = {}
+    for value in typos:
+        seen = {value}
+        target = typos[value]
+        while target in typos and target not in seen:
+            seen.add(target)
+            target = typos[target]
+        if target not in seen:
+            resolved[value] = target
+    return resolved
+
+
+def check_typos(value_counts, column_name):
+    # Near-duplicate values are clustered locally (see typo_clustering); case, accent and spacing variants are
+    # corrected as they are and the clusters go to the LLM, whose corrections must stay within their cluster
+    typos, ambiguous = cluster_values(value_counts.index, value_counts.to_numpy())
+    metrics.increment('typo_corrections_total', len(typos), source='local')
+    if not ambiguous:
+        return resolve_typos(typos)
+    prompts = split_prompts(CHECK_TYPO_CLUSTERS_PROMPT, 'clusters', ambiguous, column_name=column_name)
+    if prompts is None:
+        print(f"  Too many typo clusters in column {column_name} to check with the LLM, skipped")
+        metrics.increment('llm_stages_skipped_total', reason='too_many_requests')
+        return resolve_typos(typos)
+    cluster_of = {value: i for i, cluster in enumerate(ambiguous) for value, _ in cluster}
+    for (_, request_prompt), response in zip(prompts, generate_llm_responses([prompt for _, prompt in prompts])):
+        try:
+            suggested = json.loads(response)["typos"]
+            corrections = {value: correction for value, correction in suggested.items()
+                           if value != correction and value in cluster_of and cluster_of.get(correction) == cluster_of[value]}
+        except (json.JSONDecodeError, TypeError, KeyError, AttributeError):
+            discard_llm_response(request_prompt)
+            metrics.increment('llm_parse_failures_total', prompt='typos')
+            print(f"Error parsing LLM response for typo check in column {column_name}")
+            continue
+        metrics.increment('typo_corrections_total', len(corrections), source='llm')
+        typos.update(corrections)
+    return resolve_typos(typos)
+
+
+def transform_string_column(column_data, column_name, prompt=TRANSFORM_STRING_PROMPT):
+    # Many unique values go out in several requests whose mappings are merged
     unique_values = column_data.unique().tolist()
-    prompt = TRANSFORM_STRING_PROMPT.format(column_name=column_name, unique_values=unique_values)
-    response = generate_llm_response(prompt)
-    try:
-        result = json.loads(response)
-        return result
-    except json.JSONDecodeError:
-        print(f"Error parsing LLM response for string transformation in column {column_name}")
+    prompts = split_prompts(prompt, 'unique_values', unique_values, column_name=column_name)
+    if prompts is None:
+        print(f"  Too many unique values in column {column_name} to transform with the LLM, skipped")
+        metrics.increment('llm_stages_skipped_total', reason='too_many_requests')
         return {}
+    result = {}
+    for (_, request_prompt), response in zip(prompts, generate_llm_responses([prompt for _, prompt in prompts])):
+        try:
+            result.update(json.loads(response))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            discard_llm_response(request_prompt)
+            metrics.increment('llm_parse_failures_total', prompt='transform_strings')
+            print(f"Error parsing LLM response for string transformation in column {column_name}")
+    return result
 
 
-def check_low_count_values(column_data, column_name):
-    value_counts = column_data.value_counts().to_dict()
-    prompt = CHECK_LOW_COUNT_VALUES_PROMPT.format(column_name=column_name, value_counts=value_counts)
-    response = generate_llm_response(prompt)
-    try:
-        result = json.loads(response)
-        return result
-    except json.JSONDecodeError:
-        print(f"Error parsing LLM response for low count values in column {column_name}")
+def check_low_count_values(column_data, column_name, value_counts=None):
+    if value_counts is None:
+        value_counts = column_data.value_counts()
+    prompts = split_prompts(CHECK_LOW_COUNT_VALUES_PROMPT, 'value_counts', value_counts.to_dict().items(), as_dict=True,
+                            column_name=column_name)
+    if prompts is None:
+        print(f"  Too many distinct values in column {column_name} to check low counts with the LLM, skipped")
+        metrics.increment('llm_stages_skipped_total', reason='too_many_requests')
         return []
+    result = []
+    for (_, request_prompt), response in zip(prompts, generate_llm_responses([prompt for _, prompt in prompts])):
+        try:
+            result.extend(json.loads(response))
+        except (json.JSONDecodeError, TypeError):
+            discard_llm_response(request_prompt)
+            metrics.increment('llm_parse_failures_total', prompt='low_count_values')
+            print(f"Error parsing LLM response for low count values in column {column_name}")
+    return result
 
 
-def remove_empty_columns(df, threshold=EMPTY_THRESHOLD):
+def filled_columns(selection, threshold=EMPTY_THRESHOLD):
+    # Columns of a FrameSelection with at least threshold valid data, counted one column at a time
     print(f"Removing columns with less than {threshold * 100}% valid data...")
-    valid_threshold = int(df.shape[0] * threshold)
-    df = df.dropna(axis=1, thresh=valid_threshold)
-    return df
+    valid_threshold = int(len(selection) * threshold)
+    return [column for column in selection.columns if selection.column(column).notna().sum() >= valid_threshold]
 
 
-def remove_empty_rows(df, threshold=EMPTY_THRESHOLD):
+def filled_rows(selection, threshold=EMPTY_THRESHOLD):
+    # Row mask of a FrameSelection's rows with at least threshold valid data, summed one column at a time
     print(f"Removing rows with less than {threshold * 100}% valid data...")
-    valid_threshold = int(df.shape[1] * threshold)
-    df = df.dropna(axis=0, thresh=valid_threshold)
-    return df
+    valid_threshold = int(len(selection.columns) * threshold)
+    valid_cells = np.zeros(len(selection), dtype=np.int64)
+    for column in selection.columns:
+        valid_cells += selection.column(column).notna().to_numpy()
+    return valid_cells >= valid_threshold
 
 
-def remove_low_count_categories(df):
+def remove_empty_columns(df, threshold=EMPTY_THRESHOLD):
+    selection = FrameSelection(df)
+    selection.keep_columns(filled_columns(selection, threshold))
+    return selection.frame()
+
+
+def remove_empty_rows(df, threshold=EMPTY_THRESHOLD):
+    selection = FrameSelection(df)
+    selection.keep_rows(filled_rows(selection, threshold))
+    return selection.frame()
+
+
+def mask_low_count_categories(selection, value_counts=None):
+    # value_counts optionally gives the counts of some columns already (see profiler.profile_frame); other columns
+    # are counted through a ColumnIndex. Rows are masked in one pass rather than replaced value by value, and only
+    # the columns that change are replaced in the selection
     print("Removing strings with count below 2...")
-    for col in df.select_dtypes(include=['object']).columns:
-        value_counts = df[col].value_counts()
-        to_remove = value_counts[value_counts < 2].index
-        df[col] = df[col].replace(to_remove, np.nan)
-    return df
+    value_counts = value_counts or {}
+    for col in string_columns(selection.empty_frame()):
+        column = selection.column(col)
+        counts = value_counts.get(col)
+        if counts is not None:
+            low_rows = column.isin(counts.index[counts < 2])
+        else:
+            index = ColumnIndex.from_column(column)
+            low_rows = index.rows(index.counts < 2)
+        if low_rows.any():
+            # Object columns left with only numbers become numeric, as replace() made them
+            selection.replace(col, column.mask(low_rows).infer_objects())
 
 
-def clean_column(df, column_name):
-    print(f"Cleaning column: {column_name}")
-    column_data = df[column_name]
-    total_rows = len(column_data)
-    empty_indices = []
-    invalid_indices = []
+def remove_low_count_categories(df, value_counts=None):
+    selection = FrameSelection(df)
+    mask_low_count_categories(selection, value_counts)
+    return selection.frame()
+
+
+def unique_value_batches(uniques, counts):
+    # Distinct values, most frequent first, so the batch that decides the data type covers the most rows
+    order = values_by_frequency(counts)
+    offsets = range(0, len(order), BATCH_SIZE)
+    batches = [uniques.iloc[order[i:i + BATCH_SIZE]] for i in offsets]
+    return order, offsets, batches
+
+
+def mark_batch_results(results, batches, empty_values, invalid_values):
+    # batches: positions in the unique values of the values sent in each batch
+    for batch_positions, result in zip(batches, results):
+        empty_values[valid_positions(result["empty_indices"], batch_positions)] = True
+        invalid_values[valid_positions(result["invalid_indices"], batch_positions)] = True
+
+
+def combine_batch_results(results, order, offsets, num_values):
     data_type = "string"
-    nonconforming_cells = 0
+    empty_values = np.zeros(num_values, dtype=bool)
+    invalid_values = np.zeros(num_values, dtype=bool)
+    mark_batch_results(results, [order[i:i + BATCH_SIZE] for i in offsets], empty_values, invalid_values)
+    if results:  # Use the data type from the first batch
+        data_type = results[0]["data_type"]
+
+    return data_type, empty_values, invalid_values
+
+
+def validate_adaptively(uniques, counts, column_name):
+    # Adaptive mode: the most frequent values first (the batch that decides the data type in the default mode too),
+    # then stratified samples that double the values checked, until the invalid share is known to within
+    # ADAPTIVE_CI_HALF_WIDTH. Rules learned from the verdicts cover the values never sent, provided they agree with
+    # the LLM on the last sample, which they did not learn from
+    num_values = len(uniques)
+    order = values_by_frequency(counts)
+    shapes = value_shapes(uniques)
+    sampled = np.zeros(num_values, dtype=bool)
+    empty_values = np.zeros(num_values, dtype=bool)
+    invalid_values = np.zeros(num_values, dtype=bool)
+    total_batches = -(-num_values // BATCH_SIZE)
+    data_type = None
+    sent = 0
+    while True:
+        if data_type is None:
+            positions = order[:BATCH_SIZE]
+        else:
+            size = min(sent, ADAPTIVE_MAX_BATCHES - sent) * BATCH_SIZE
+            positions = stratified_sample(order, shapes, sampled, size)
+        batches = [positions[i:i + BATCH_SIZE] for i in range(0, len(positions), BATCH_SIZE)]
+        results = process_column_batches([uniques.iloc[batch] for batch in batches], column_name, data_type)
+        mark_batch_results(results, batches, empty_values, invalid_values)
+        if data_type is None:
+            data_type = results[0]["data_type"]
+        sampled[positions] = True
+        sent += len(batches)
+        invalid_share, half_width = invalid_share_interval(shapes, sampled & ~empty_values, invalid_values)
+        # At least two rounds, so the rules from the first can be checked against the last
+        if sampled.all() or sent >= ADAPTIVE_MAX_BATCHES or (sent > 1 and half_width <= ADAPTIVE_CI_HALF_WIDTH):
+            break
+
+    rest = ~sampled
+    message = f"{sent} of {total_batches} LLM batches sent, invalid share {invalid_share:.1%} +/- {half_width:.1%}"
+    if rest.any():
+        last_round = np.zeros(num_values, dtype=bool)
+        last_round[positions] = True
+        rule_empty, rule_invalid = learned_rules(uniques, shapes, data_type, sampled & ~last_round,
+                                                 empty_values, invalid_values)
+        agreement = rule_agreement(rule_empty, rule_invalid, last_round, empty_values, invalid_values)
+        if agreement >= RULE_MIN_AGREEMENT:
+            rule_empty, rule_invalid = learned_rules(uniques, shapes, data_type, sampled, empty_values, invalid_values)
+            empty_values[rest] = rule_empty[rest]
+            invalid_values[rest] = rule_invalid[rest]
+            message += f", rules agree on {agreement:.0%} of the last sample and cover {rest.sum()} values"
+            metrics.increment('llm_batches_skipped_total', total_batches - sent, reason='adaptive_validation')
+        else:
+            # The rules do not describe the column well enough: the rest goes to the LLM as in the default mode
+            remaining = order[rest[order]]
+            batches = [remaining[i:i + BATCH_SIZE] for i in range(0, len(remaining), BATCH_SIZE)]
+            results = process_column_batches([uniques.iloc[batch] for batch in batches], column_name, data_type)
+            mark_batch_results(results, batches, empty_values, invalid_values)
+            message += (f", rules agree on only {agreement:.0%} of the last sample: "
+                        f"{len(batches)} more LLM batches sent")
+    print(f"  Adaptive validation: {message}")
+    return data_type, empty_values, invalid_values
+
+
+def validate_unique_values(uniques, counts, column_name, batch_results=None):
+    order, offsets, batches = unique_value_batches(uniques, counts)
+    if batch_results is None and ADAPTIVE_VALIDATION and len(batches) > 2:
+        print(f"  Unique values: {len(uniques)} ({len(batches)} LLM batches, adaptive)")
+        return validate_adaptively(uniques, counts, column_name)
+    if batch_results is None:
+        print(f"  Unique values: {len(uniques)} ({len(batches)} LLM batches)")
+        batch_results = process_column_batches(batches, column_name)
+    return combine_batch_results(batch_results, order, offsets, len(uniques))
+
+
+def build_packed_prompt(pack):
+    batches = "\n".join(f"{key}: column '{column_name}', values {batch.tolist()}" for key, column_name, _, batch in pack)
+    return CHECK_PACKED_COLUMN_CONTENT_PROMPT.format(batches=batches)
+
+
+def parse_packed_response(response, pack):
+    # Returns one result per batch in the pack, or None if any batch is missing or malformed
+    try:
+        parsed = json.loads(response)
+        results = [parsed[key] for key, _, _, _ in pack]
+        if not all(isinstance(result, dict) and all(k in result for k in ['data_type', 'empty_indices', 'invalid_indices'])
+                   for result in results):
+            metrics.increment('llm_parse_failures_total', prompt='packed_column_content')
+            return None
+        return results
+    except (json.JSONDecodeError, KeyError, TypeError):
+        metrics.increment('llm_parse_failures_total', prompt='packed_column_content')
+        return None
+
+
+def pack_batches(items, token_budget=PACK_TOKEN_BUDGET):
+    base_tokens = estimate_tokens(build_packed_prompt([]))
+    packs, current, used = [], [], base_tokens
+    for item in items:
+        tokens = estimate_tokens(build_packed_prompt([item])) - base_tokens
+        if current and used + tokens > token_budget:
+            packs.append(current)
+            current, used = [], base_tokens
+        current.append(item)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def resolve_pack(pack, response):
+    results = parse_packed_response(response, pack)
+    if results is not None:
+        return results
+    discard_llm_response(build_packed_prompt(pack))
+    if len(pack) == 1:
+        # A single batch falls back to the per-column prompt
+        _, column_name, _, batch = pack[0]
+        return [process_column_batch(batch, column_name)]
+    print(f"Could not parse packed response for {len(pack)} batches, retrying in smaller packs")
+    halves = [pack[:len(pack) // 2], pack[len(pack) // 2:]]
+    responses = generate_llm_responses([build_packed_prompt(half) for half in halves])
+    return [result for half, half_response in zip(halves, responses) for result in resolve_pack(half, half_response)]
 
-    for i in range(0, total_rows, BATCH_SIZE):
-        batch = column_data.iloc[i:i + BATCH_SIZE]
-        result = process_column_batch(batch, column_name)
 
-        valid_empty_indices = [idx for idx in result["empty_indices"] if idx + i < total_rows]
-        valid_invalid_indices = [idx for idx in result["invalid_indices"] if idx + i < total_rows]
+def validate_columns_packed(selection, columns, token_budget=PACK_TOKEN_BUDGET):
+    # Batch results per column of a FrameSelection for every column the local type inference can't decide
+    items = []
+    for column in columns:
+        codes, uniques, counts = factorize_column(selection.column(column))
+        if infer_column_type(uniques, counts) is not None:
+            continue
+        _, _, batches = unique_value_batches(uniques, counts)
+        start = len(items)
+        items.extend((f"b{start + j}", column, j, batch) for j, batch in enumerate(batches))
 
-        empty_indices.extend([idx + i for idx in valid_empty_indices])
-        invalid_indices.extend([idx + i for idx in valid_invalid_indices])
+    packs = pack_batches(items, token_budget)
+    print(f"Packed {len(items)} column batches into {len(packs)} LLM requests")
+    responses = generate_llm_responses([build_packed_prompt(pack) for pack in packs])
 
-        if i == 0:  # Use the data type from the first batch
-            data_type = result["data_type"]
+    results = {}
+    for pack, response in zip(packs, responses):
+        for (_, column, batch_index, _), result in zip(pack, resolve_pack(pack, response)):
+            results.setdefault(column, {})[batch_index] = result
+    return {column: [by_index[i] for i in sorted(by_index)] for column, by_index in results.items()}
+
+
+def transform_strings(column_data, transform_result, normalize=False):
+    # Optionally normalize locally first, then apply the string mapping and turn "nan" strings into real missing values
+    if normalize:
+        column_data = normalize_strings(column_data)
+    transformed = column_data.map(transform_result).fillna(column_data)
+    return transformed.replace(NAN_STRINGS)
+
+
+def transform_column_index(index, transform_result, normalize=False):
+    # transform_strings on the distinct values only
+    return index.map_values(transform_strings(index.uniques, transform_result, normalize))
+
+
+def correct_typos(index, typos):
+    # Typo corrections on the distinct values only; values without a correction are kept
+    if not typos:
+        return index
+    return index.map_values(index.uniques.map(typos).fillna(index.uniques))
+
+
+def looks_categorical(distinct_values, filled_rows):
+    if distinct_values > CATEGORICAL_MAX_VALUES:
+        return False
+    return distinct_values <= CATEGORICAL_MIN_VALUES or distinct_values / filled_rows <= CATEGORICAL_MAX_RATIO
+
+
+def decide_column(column_data, column_name, value_counts=None, batch_results=None, index=None):
+    # Work out how to clean a column; value_counts optionally gives counts over more rows than column_data,
+    # batch_results optionally gives LLM verdicts already fetched in packing mode, index the column's ColumnIndex
+    data_type = "string"
+    date_format = None
+
+    if index is None:
+        index = ColumnIndex.from_column(column_data)
+    codes, uniques, counts = index.codes, index.uniques, index.counts
+
+    # Decide obvious columns locally and only ask the LLM about ambiguous ones
+    inferred = infer_column_type(uniques, counts)
+    llm_batches = -(-len(uniques) // BATCH_SIZE)
+    record_inference(inferred is not None, llm_batches)
+    if inferred is not None:
+        data_type = inferred["data_type"]
+        date_format = inferred["date_format"]
+        empty_values = inferred["empty_values"]
+        invalid_values = inferred["invalid_values"]
+        print(f"  Data type inferred locally, skipped {llm_batches} LLM batches")
+    else:
+        data_type, empty_values, invalid_values = validate_unique_values(uniques, counts, column_name, batch_results)
 
     print(f"  Data type determined: {data_type}")
-    print(f"  Empty cells: {len(empty_indices)}")
-    print(f"  Invalid cells: {len(invalid_indices)}")
+    print(f"  Empty cells: {(codes < 0).sum() + counts[empty_values].sum()}")
+    print(f"  Invalid cells: {counts[invalid_values & ~empty_values].sum()}")
+
+    decisions = {
+        'data_type': data_type,
+        'date_format': date_format,
+        'empty_values': uniques[empty_values].tolist(),
+        'invalid_values': uniques[invalid_values & ~empty_values].tolist(),
+        'normalize': False,
+        'transform': {},
+        'typos': {},
+        'low_count_values': []
+    }
+
+    distinct_values = int((counts > 0).sum())
+    if data_type == "string" or data_type == "object":
+        # Local normalization, which also turns null tokens into missing values, runs on every text column; the LLM
+        # stages only run on columns that look categorical
+        normalize = STRING_NORMALIZATION != 'llm'
+        decisions['normalize'] = normalize
+        if not looks_categorical(distinct_values, int(counts.sum())):
+            print(f"  {distinct_values} distinct values, not categorical: skipped the transform, low count and typo checks")
+            metrics.increment('llm_stages_skipped_total', 3, reason='not_categorical')
+            return decisions
+
+        # Transform string values: only ask the LLM for what the local rules cannot do
+        transform_result = {}
+        if normalize:
+            transformed = transform_column_index(index, {}, normalize=True)
+            print(f"  Strings normalized locally: {len(transformed.uniques)} of {distinct_values} distinct values left")
+            metrics.increment('llm_stages_skipped_total', reason='local_normalization')
+            if STRING_NORMALIZATION == 'local+llm':
+                transform_result = transform_string_column(transformed, column_name, REWRITE_STRING_PROMPT)
+        else:
+            transform_result = transform_string_column(index, column_name)
+        if transform_result or not normalize:
+            transformed = transform_column_index(index, transform_result, normalize)
+        if value_counts is not None:
+            transformed_index = transform_strings(value_counts.index.to_series(), transform_result, normalize)
+            value_counts = value_counts.groupby(transformed_index.to_numpy()).sum()
+
+        # Correct typos, then check for low count values among the corrected values
+        typos = check_typos(value_counts if value_counts is not None else transformed.value_counts(), column_name)
+        if typos:
+            print(f"  Typos corrected: {len(typos)} values")
+            transformed = correct_typos(transformed, typos)
+            if value_counts is not None:
+                value_counts = value_counts.groupby(value_counts.index.map(lambda value: typos.get(value, value))).sum()
+        low_count_values = check_low_count_values(transformed, column_name, value_counts=value_counts)
+
+        decisions['transform'] = transform_result
+        decisions['typos'] = typos
+        decisions['low_count_values'] = low_count_values
+
+    return decisions
+
+
+def apply_column_decisions(column_data, decisions, index=None):
+    # Conversions and lookups run on the distinct values of the column (its ColumnIndex) and are spread to the rows
+    if index is None:
+        index = ColumnIndex.from_column(column_data)
+    source_dtype = column_data.dtype
+    empty_rows = (index.codes < 0) | index.isin(decisions['empty_values'])
+    invalid_rows = index.isin(decisions['invalid_values']) & ~empty_rows
 
     # Convert column to determined data type
+    data_type = decisions['data_type']
     if data_type == "float":
-        df.loc[:, column_name] = pd.to_numeric(df[column_name], errors='coerce')
+        column_data = index.take(pd.to_numeric(index.uniques, errors='coerce'))
     elif data_type == "integer":
-        df.loc[:, column_name] = pd.to_numeric(df[column_name], errors='coerce').astype('Int64')
+        column_data = index.take(pd.to_numeric(index.uniques, errors='coerce')).astype('Int64')
     elif data_type == "date":
-        df[column_name] = pd.to_datetime(df[column_name], errors='coerce')
+        column_data = index.take(pd.to_datetime(index.uniques, errors='coerce', format=decisions['date_format']))
     elif data_type == "string" or data_type == "object":
-        # Transform string values
-        transform_result = transform_string_column(column_data, column_name)
-        df[column_name] = df[column_name].map(transform_result).fillna(df[column_name])
+        # Older journals and plans have no local normalization or typo corrections
+        transformed = transform_column_index(index, decisions['transform'], decisions.get('normalize', False))
+        transformed = correct_typos(transformed, decisions.get('typos'))
+        column_data = transformed.mask(transformed.uniques.isin(decisions['low_count_values']).to_numpy(dtype=bool)).to_series()
+        if source_dtype != object and pd.api.types.is_string_dtype(source_dtype):
+            # The mapped values come out as object; Arrow-backed and pandas string columns keep their dtype
+            column_data = column_data.astype(source_dtype)
 
-        # Handle "nan" strings
-        df[column_name] = df[column_name].replace({"nan": np.nan, "NaN": np.nan, "NAN": np.nan})
+    # Set empty and invalid cells to NaN
+    column_data = column_data.mask(empty_rows | invalid_rows)
+    nonconforming_cells = int(empty_rows.sum() + invalid_rows.sum())
 
-        # Check for low count values
-        low_count_values = check_low_count_values(df[column_name], column_name)
-        df.loc[df[column_name].isin(low_count_values), column_name] = np.nan
+    return column_data, nonconforming_cells
 
-        # Check for typos
-        typo_result = check_typos(df[column_name], column_name)
-        if typo_result["typos"]:
-            print(f"  Potential typos found: {typo_result['typos']}")
 
-    # Set empty and invalid cells to NaN
-    df.loc[empty_indices + invalid_indices, column_name] = np.nan
-    nonconforming_cells = len(empty_indices) + len(invalid_indices)
+def clean_column_values(column_data, column_name, batch_results=None, journal=None, plan=None, value_counts=None):
+    # Returns the cleaned column and its nonconforming cell count. journal optionally replays and records column
+    # decisions (see checkpoint.RunCheckpoint); plan optionally applies planned decisions and records new ones (see
+    # cleaning_plan.CleaningPlan); value_counts optionally gives the column's value counts (see profiler.profile_frame)
+    print(f"Cleaning column: {column_name}")
+    # One index of the column's distinct values serves every step below
+    if value_counts is not None:
+        index = ColumnIndex.from_counts(column_data, value_counts)
+    else:
+        index = ColumnIndex.from_column(column_data)
+    cleaned = None
+    decisions = journal.column_decisions(column_name) if journal is not None else None
+    if decisions is not None:
+        print("  Reusing decisions from the checkpoint journal")
+    elif plan is not None and plan.column_decisions(column_name) is not None:
+        decisions = plan.column_decisions(column_name)
+        cleaned, nonconforming_cells = apply_column_decisions(column_data, decisions, index)
+        drift = plan.drift(column_name, column_data, cleaned)
+        if drift > plan.drift_threshold:
+            print(f"  Column drifted from the cleaning plan ({drift:.0%}), profiling it again")
+            metrics.increment('plan_columns_total', outcome='drifted')
+            decisions = cleaned = None
+        else:
+            print("  Applying decisions from the cleaning plan")
+            metrics.increment('plan_columns_total', outcome='applied')
+    elif plan is not None:
+        metrics.increment('plan_columns_total', outcome='new')
+
+    if decisions is None:
+        decisions = decide_column(column_data, column_name, batch_results=batch_results, index=index)
+        if journal is not None:
+            journal.record_decisions(column_name, decisions)
+    if cleaned is None:
+        cleaned, nonconforming_cells = apply_column_decisions(column_data, decisions, index)
+        if plan is not None:
+            plan.record_column(column_name, decisions, column_data, cleaned)
+    return cleaned, nonconforming_cells
+
 
+def clean_column(df, column_name, batch_results=None, journal=None, plan=None, value_counts=None):
+    df[column_name], nonconforming_cells = clean_column_values(df[column_name], column_name, batch_results, journal, plan,
+                                                               value_counts)
     return df, nonconforming_cells
 
 
-def remove_outliers(df):
+def _init_column_worker(llm_concurrency):
+    # Workers split the LLM concurrency budget between them
+    set_max_concurrency(llm_concurrency)
+
+
+def _clean_column_in_worker(handle, column_name, batch_results, journal, plan, value_counts):
+    start_time = time.time()
+    reset_inference_stats()
+    metrics.reset()
+    frame, block = open_shared_frame(handle)
+    try:
+        frame, nonconforming = clean_column(frame, column_name, batch_results=batch_results, journal=journal,
+                                            plan=plan, value_counts=value_counts)
+        payload = frame_to_bytes(frame)
+    finally:
+        # The frame may point into the block, so it goes first
+        frame = None
+        close_shared_frame(block)
+    plan_entry = plan.columns.get(column_name) if plan is not None else None
+    return payload, nonconforming, dict(inference_stats), metrics.snapshot(), plan_entry, time.time() - start_time
+
+
+def clean_columns_in_workers(selection, columns, packed_results, workers=COLUMN_WORKERS, journal=None, plan=None,
+                             value_counts=None):
+    # Yields (column, cleaned column, nonconforming cells, seconds) for columns of a FrameSelection as workers
+    # finish; at most two columns per worker sit in shared memory at a time. Each worker gets the plan entry of its
+    # column and sends back the entry it ends up with
+    llm_concurrency = max(1, llm_config.MAX_CONCURRENT_REQUESTS // workers)
+    context = multiprocessing.get_context('spawn')
+    pending_columns = list(columns)
+    running = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_column_worker, initargs=(llm_concurrency,)) as executor:
+            while pending_columns or running:
+                while pending_columns and len(running) < 2 * workers:
+                    column = pending_columns.pop(0)
+                    handle, block = share_frame(selection.column(column).to_frame(column))
+                    future = executor.submit(_clean_column_in_worker, handle, column, packed_results.get(column),
+                                             journal, plan.subset([column]) if plan is not None else None,
+                                             (value_counts or {}).get(column))
+                    running[future] = (column, block)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    column, block = running.pop(future)
+                    release_shared_frame(block)
+                    payload, nonconforming, worker_stats, worker_metrics, plan_entry, seconds = future.result()
+                    merge_inference_stats(worker_stats)
+                    metrics.merge(worker_metrics)
+                    if plan_entry is not None:
+                        plan.columns[column] = plan_entry
+                    cleaned = frame_from_bytes(payload)[column].set_axis(selection.index)
+                    yield column, cleaned, nonconforming, seconds
+    finally:
+        # A failed worker or an abandoned generator leaves the other columns in flight; the pool has waited for them
+        for _, block in running.values():
+            release_shared_frame(block)
+
+
+def iqr_bounds(q1, q3, multiplier=IQR_MULTIPLIER):
+    iqr = q3 - q1
+    return q1 - multiplier * iqr, q3 + multiplier * iqr
+
+
+def _fence_bounds(numeric, method, threshold):
+    # Lower and upper fences for every column of an all-numeric frame, one reduction per statistic
+    if method == 'iqr':
+        quartiles = numeric.quantile([0.25, 0.75])
+        return iqr_bounds(quartiles.loc[0.25], quartiles.loc[0.75], threshold)
+    if method == 'zscore':
+        # A constant column has no outliers; NaN fences keep rounding in the mean from flagging all its rows
+        mean, std = numeric.mean(), numeric.std()
+        std = std.where(std > 0)
+        return mean - threshold * std, mean + threshold * std
+    if method == 'mad':
+        # Modified z-score: 0.6745 * |x - median| / MAD > threshold. When over half the values share the median the
+        # MAD is 0, so those columns fall back to 1.2533 * the mean absolute deviation, and constant ones are skipped
+        median = numeric.median()
+        deviation = (numeric - median).abs()
+        mad = deviation.median()
+        scale = (mad / 0.6745).where(mad > 0, 1.2533 * deviation.mean())
+        scale = scale.where(scale > 0)
+        return median - threshold * scale, median + threshold * scale
+    raise ValueError(f"Unknown outlier method: {method}")
+
+
+def compute_outlier_bounds(df, method=OUTLIER_METHOD, fences=None):
+    # fences optionally overrides the method per column: {column: (method, threshold)}
+    numeric = df.select_dtypes(include=[np.number])
+    # Plain float64, so nullable (Int64, Float64) and Arrow-backed columns give NaN rather than pd.NA fences
+    numeric = pd.DataFrame(numeric.to_numpy(dtype=float, na_value=np.nan), index=numeric.index, columns=numeric.columns)
+    fences = fences or {}
+    column_fences = {column: fences.get(column, (method, OUTLIER_THRESHOLDS[method])) for column in numeric.columns}
+
+    bounds = {}
+    for fence in set(column_fences.values()):
+        columns = [column for column, column_fence in column_fences.items() if column_fence == fence]
+        lower, upper = _fence_bounds(numeric[columns], *fence)
+        bounds.update({column: (lower[column], upper[column]) for column in columns})
+    return bounds
+
+
+def outlier_masks(df, bounds):
+    # Row mask of rows holding any outlier, plus per-column outlier counts, from one broadcast comparison
+    columns = [column for column in bounds if column in df.columns]
+    if not columns:
+        return np.zeros(len(df), dtype=bool), pd.Series(dtype='int64')
+    values = df[columns].to_numpy(dtype=float, na_value=np.nan)
+    lower = np.array([bounds[column][0] for column in columns], dtype=float)
+    upper = np.array([bounds[column][1] for column in columns], dtype=float)
+    cell_mask = (values < lower) | (values > upper)
+    return cell_mask.any(axis=1), pd.Series(cell_mask.sum(axis=0), index=columns)
+
+
+def outlier_rows(selection, method=OUTLIER_METHOD, fences=None):
+    # Row mask of a FrameSelection's rows holding any outlier, plus per-column outlier counts: the fences of all
+    # numeric columns in one reduction per statistic, then one broadcast comparison
+    columns = selection.empty_frame().select_dtypes(include=[np.number]).columns
+    if columns.empty:
+        return np.zeros(len(selection), dtype=bool), pd.Series(dtype='int64')
+    numeric = pd.DataFrame({column: selection.column(column).to_numpy(dtype=float, na_value=np.nan)
+                            for column in columns}, index=selection.index)
+    return outlier_masks(numeric, compute_outlier_bounds(numeric, method, fences))
+
+
+def remove_outlier_rows(selection, method=OUTLIER_METHOD, fences=None):
     print("Removing rows with outliers from numeric/integer/float columns...")
-    rows_to_remove = set()
-    for column in df.select_dtypes(include=[np.number]).columns:
-        q1 = df[column].quantile(0.25)
-        q3 = df[column].quantile(0.75)
-        iqr = q3 - q1
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        outlier_rows = df[(df[column] < lower_bound) | (df[column] > upper_bound)].index
-        rows_to_remove.update(outlier_rows)
-
-    initial_rows = len(df)
-    df = df.drop(index=list(rows_to_remove))
-    removed_rows = initial_rows - len(df)
+    row_mask, column_counts = outlier_rows(selection, method, fences)
+    selection.keep_rows(~row_mask)
+    removed_rows = int(row_mask.sum())
     print(f"Removed {removed_rows} rows containing outliers.")
-    return df, removed_rows
+    for column, count in column_counts[column_counts > 0].items():
+        print(f"  {column}: {count} outlier cells")
+    return removed_rows
 
 
-def calculate_nonconforming_cells(df):
-    nonconforming_cells = {}
-    for column in df.columns:
-        # Count NaN values
-        nan_count = df[column].isna().sum()
+def remove_outliers(df, method=OUTLIER_METHOD, fences=None):
+    selection = FrameSelection(df)
+    removed_rows = remove_outlier_rows(selection, method, fences)
+    return selection.frame(), removed_rows
 
-        # For numeric columns, count infinite values
-        if np.issubdtype(df[column].dtype, np.number):
-            inf_count = np.isinf(df[column]).sum()
-        else:
-            inf_count = 0
 
-        # For object columns, count empty strings
-        if df[column].dtype == 'object':
-            empty_string_count = (df[column] == '').sum()
-        else:
-            empty_string_count = 0
+def optimize_frame_dtypes(df):
+    print("Optimizing column dtypes...")
+    df, changes = optimize_dtypes(df)
+    saved = 0
+    for column, (dtype_before, dtype_after, bytes_before, bytes_after) in changes.items():
+        print(f"  {column}: {dtype_before} -> {dtype_after}, {bytes_before - bytes_after} bytes saved")
+        saved += bytes_before - bytes_after
+    print(f"Saved {saved} bytes in {len(changes)} columns.")
+    metrics.increment('dtype_bytes_saved_total', saved)
+    return df
 
-        nonconforming_cells[column] = nan_count + inf_count + empty_string_count
 
-    return nonconforming_cells
+def calculate_nonconforming_cells(df, profile=None):
+    # Missing, infinite and empty string cells per column
+    if profile is None:
+        profile = profile_frame(df)
+    return nonconforming_counts(profile)
 
 
-def clean_data(df):
+def clean_data(df, checkpoint_dir=None, plan=None, save_plan=None, compact_dtypes=OPTIMIZE_DTYPES):
+    # plan: a CleaningPlan (or the path of a saved one) to apply; its header map and column decisions are used
+    # instead of LLM calls, and only new or drifted columns are profiled again. save_plan: path to write the plan
+    # of this run to, including what it decided afresh. compact_dtypes: finish with optimize_dtypes, so the report
+    # and the output work on the compact frame
     start_time = time.time()
     process_times = {}
     removed_rows = 0
@@ -245,51 +853,203 @@ def clean_data(df):
     print("Starting data validation and cleaning...")
     print_dataframe_info(df, "Initial - ")
 
-    # Calculate nonconforming cells before cleaning
-    nonconforming_cells_before = calculate_nonconforming_cells(df)
+    if isinstance(plan, str):
+        plan = CleaningPlan.load(plan)
+    if plan is None and save_plan:
+        plan = CleaningPlan()
+
+    reset_inference_stats()
+    # Stage spans (see metrics) time each step; process_times is read from them
+    metrics.new_trace()
+
+    # Resume from the last completed step or column when a checkpoint exists for this exact input
+    checkpoint = RunCheckpoint.for_frame(df, checkpoint_dir) if checkpoint_dir else None
+    if checkpoint is not None and checkpoint.resumed:
+        print(f"Resuming from checkpoint in {checkpoint.run_dir} after: {', '.join(checkpoint.manifest['completed_steps'])}")
+        process_times.update(checkpoint.manifest['process_times'])
+
+    def completed(step):
+        return checkpoint is not None and checkpoint.is_done(step)
+
+    def save_step(step, selection):
+        # The selection is only materialized here when checkpointing
+        if checkpoint is not None:
+            checkpoint.save_step(step, selection.frame(), process_times)
+
+    # Calculate nonconforming cells before cleaning; the profile's value counts are reused by the low count step and
+    # when the text columns are cleaned
+    profile = None
+    if checkpoint is not None and checkpoint.manifest['nonconforming_cells_before'] is not None:
+        nonconforming_cells_before = checkpoint.manifest['nonconforming_cells_before']
+    else:
+        profile = profile_frame(df)
+        nonconforming_cells_before = calculate_nonconforming_cells(df, profile)
+        whitespace_cells = int(profile['whitespace'].sum())
+        if whitespace_cells:
+            print(f"Whitespace-only cells: {whitespace_cells}")
+        if checkpoint is not None:
+            checkpoint.save_metadata(nonconforming_cells_before={column: int(count) for column, count in nonconforming_cells_before.items()})
 
     steps = ['Normalize headers', 'Remove empty columns', 'Remove empty rows', 'Remove low count strings', 'Clean columns', 'Remove outliers']
     total_steps = len(steps) + len(df.columns)  # Add column count for individual column cleaning
 
+    # The steps narrow down a selection of the input's rows and columns and replace the columns they change; the
+    # cleaned frame is materialized once, at the end, instead of copying the whole frame at every step
+    selection = FrameSelection(df)
+
     # Step 1: Normalize column headers
-    step_start_time = time.time()
-    df = check_and_normalize_column_headers(df)
-    process_times['Normalize headers'] = time.time() - step_start_time
+    if completed('Normalize headers'):
+        # Rename the caller's frame as a fresh run would, then continue from the saved frame
+        df.columns = checkpoint.manifest['columns_after_headers']
+        selection = FrameSelection(checkpoint.load_frame())
+    else:
+        with metrics.span('Normalize headers', frame=df) as span:
+            original_columns = df.columns.tolist()
+            planned_columns = plan.headers_for(original_columns) if plan is not None else None
+            if planned_columns is not None:
+                print("Applying column headers from the cleaning plan")
+                df.columns = planned_columns
+            else:
+                df = check_and_normalize_column_headers(df)
+                if plan is not None:
+                    plan.record_headers(original_columns, df.columns)
+            if profile is not None:
+                profile = rename_profile(profile, original_columns, df.columns)
+            selection = FrameSelection(df)
+            span.record_frame(selection)
+        process_times['Normalize headers'] = span.duration
+        if checkpoint is not None:
+            checkpoint.save_metadata(columns_after_headers=df.columns.tolist())
+        save_step('Normalize headers', selection)
     yield 1 / total_steps, "Normalized headers"
 
     # Step 2: Remove empty columns (less than 60% valid data)
-    step_start_time = time.time()
-    df = remove_empty_columns(df)
-    process_times['Remove empty columns'] = time.time() - step_start_time
+    if not completed('Remove empty columns'):
+        with metrics.span('Remove empty columns', frame=selection) as span:
+            columns_before = pd.Index(selection.columns)
+            if plan is not None and plan.removed_columns:
+                # Keep the columns of planned runs the same, even on days a removed column happens to be filled
+                selection.keep_columns([column for column in selection.columns if column not in plan.removed_columns])
+            selection.keep_columns(filled_columns(selection))
+            if plan is not None:
+                plan.record_removed_columns(columns_before.difference(selection.columns, sort=False))
+            span.record_frame(selection)
+        process_times['Remove empty columns'] = span.duration
+        save_step('Remove empty columns', selection)
     yield 2 / total_steps, "Removed empty columns"
 
     # Step 3: Remove empty rows (less than 60% valid data)
-    step_start_time = time.time()
-    df = remove_empty_rows(df)
-    process_times['Remove empty rows'] = time.time() - step_start_time
+    if not completed('Remove empty rows'):
+        with metrics.span('Remove empty rows', frame=selection) as span:
+            keep = filled_rows(selection)
+            if profile is not None and not keep.all():
+                counted = [column for column in profile['value_counts'] if column in selection.columns]
+                profile['value_counts'] = remove_rows_from_counts(profile['value_counts'], selection.dropped_rows(keep, counted))
+            selection.keep_rows(keep)
+            span.record_frame(selection)
+        process_times['Remove empty rows'] = span.duration
+        save_step('Remove empty rows', selection)
     yield 3 / total_steps, "Removed empty rows"
 
     # Step 4: Remove low count categories
-    step_start_time = time.time()
-    df = remove_low_count_categories(df)
-    process_times['Remove low count strings'] = time.time() - step_start_time
+    if not completed('Remove low count strings'):
+        with metrics.span('Remove low count strings', frame=selection) as span:
+            mask_low_count_categories(selection, profile['value_counts'] if profile is not None else None)
+            span.record_frame(selection)
+        process_times['Remove low count strings'] = span.duration
+        save_step('Remove low count strings', selection)
     yield 4 / total_steps, "Removed low count strings"
 
     # Step 5: Clean columns (in batches)
-    column_cleaning_times = {}
-    for i, column in enumerate(df.columns):
-        column_start_time = time.time()
-        df, nonconforming = clean_column(df, column)
-        column_cleaning_times[f"Clean column: {column}"] = time.time() - column_start_time
-        yield (5 + i) / total_steps, f"Cleaning column: {column}"
-    process_times.update(column_cleaning_times)
+    if not completed('Clean columns'):
+        column_cleaning_times = {}
+        columns_to_clean = list(selection.columns)
+        if checkpoint is not None:
+            for column in checkpoint.completed_columns():
+                selection.replace(column, checkpoint.load_column(column))
+                column_cleaning_times[f"Clean column: {column}"] = checkpoint.manifest['completed_columns'][column]['seconds']
+                columns_to_clean.remove(column)
+            if len(columns_to_clean) < len(selection.columns):
+                print(f"Loaded {len(selection.columns) - len(columns_to_clean)} cleaned columns from the checkpoint")
+        columns_done = len(selection.columns) - len(columns_to_clean)
+
+        packed_results = {}
+        if PACK_COLUMN_BATCHES:
+            with metrics.span('Validate packed column batches', rows_in=len(selection), columns_in=len(columns_to_clean),
+                              cells_in=len(selection) * len(columns_to_clean)) as span:
+                # Columns with planned decisions only go to the LLM if they drift
+                packed_results = validate_columns_packed(selection, [column for column in columns_to_clean if plan is None
+                                                                     or plan.column_decisions(column) is None])
+            column_cleaning_times['Validate packed column batches'] = span.duration
+        # The profile's value counts, less the low count strings masked above, spare counting the text columns again
+        value_counts = {}
+        if profile is not None:
+            text_columns = set(string_columns(selection.empty_frame()))
+            value_counts = {column: counts[counts >= 2] for column, counts in profile['value_counts'].items()
+                            if column in text_columns}
+        if COLUMN_WORKERS > 1:
+            cleaned_columns = clean_columns_in_workers(selection, columns_to_clean, packed_results, journal=checkpoint,
+                                                       plan=plan, value_counts=value_counts)
+            for i, (column, cleaned, nonconforming, seconds) in enumerate(cleaned_columns, start=columns_done):
+                selection.replace(column, cleaned)
+                span = metrics.record_span('Clean column', seconds, column=column, rows_in=len(selection), columns_in=1,
+                                           cells_in=len(selection), nonconforming_cells=nonconforming)
+                column_cleaning_times[f"Clean column: {column}"] = span.duration
+                if checkpoint is not None:
+                    checkpoint.save_column(column, cleaned, seconds)
+                yield (5 + i) / total_steps, f"Cleaned column: {column}"
+        else:
+            for i, column in enumerate(columns_to_clean, start=columns_done):
+                with metrics.span('Clean column', column=column, rows_in=len(selection), columns_in=1,
+                                  cells_in=len(selection)) as span:
+                    cleaned, nonconforming = clean_column_values(selection.column(column), column,
+                                                                 batch_results=packed_results.get(column),
+                                                                 journal=checkpoint, plan=plan,
+                                                                 value_counts=value_counts.get(column))
+                    selection.replace(column, cleaned)
+                    span.set(nonconforming_cells=nonconforming)
+                column_cleaning_times[f"Clean column: {column}"] = span.duration
+                if checkpoint is not None:
+                    checkpoint.save_column(column, cleaned, column_cleaning_times[f"Clean column: {column}"])
+                yield (5 + i) / total_steps, f"Cleaning column: {column}"
+        process_times.update(column_cleaning_times)
+        save_step('Clean columns', selection)
 
     # Step 6: Remove outliers from numeric columns
-    step_start_time = time.time()
-    df, outlier_rows_removed = remove_outliers(df)
-    removed_rows += outlier_rows_removed
-    process_times['Remove outliers'] = time.time() - step_start_time
+    if completed('Remove outliers'):
+        removed_rows = checkpoint.manifest['removed_rows']
+        df = selection.frame()
+    else:
+        with metrics.span('Remove outliers', frame=selection) as span:
+            removed_rows += remove_outlier_rows(selection)
+            # The one copy of the cleaned data
+            df = selection.frame()
+            del selection
+            span.record_frame(df)
+        process_times['Remove outliers'] = span.duration
+        if checkpoint is not None:
+            checkpoint.save_metadata(removed_rows=removed_rows)
+            checkpoint.save_step('Remove outliers', df, process_times)
+            checkpoint.complete()
+
+    # Step 7: Store the result in compact dtypes
+    if compact_dtypes:
+        with metrics.span('Optimize dtypes', frame=df) as span:
+            df = optimize_frame_dtypes(df)
+            span.record_frame(df)
+        process_times['Optimize dtypes'] = span.duration
+
+    if save_plan:
+        plan.save(save_plan)
+        print(f"Cleaning plan saved to {save_plan}")
     yield 1.0, (df, nonconforming_cells_before, process_times, removed_columns, removed_rows)
 
+    print_inference_report()
+
+    stats = cache_stats()
+    if stats:
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    metrics.flush()
+
     print("Cleaning process completed.")
     print_dataframe_info(df, "Final - ")
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+PLAN_VERSION = 1
+
+# A planned column is re-profiled through the LLM when any of its statistics moves by more than this
+PLAN_DRIFT_THRESHOLD = float(os.getenv('PLAN_DRIFT_THRESHOLD', '0.1'))
+
+# String columns up to this many distinct values (and this share of distinct values per row) keep their value set,
+# so values never seen when the plan was made count as drift
+PLAN_MAX_KNOWN_VALUES = 10000
+PLAN_MAX_DISTINCT_RATIO = 0.2
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _value_keys(values):
+    # Plans are saved as JSON, which turns values of other types into strings, so known values are kept and
+    # compared in their str form; plans saved before this still hold JSON numbers and booleans
+    return [str(value) for value in values]
+
+
+def column_profile(column_data, cleaned, data_type):
+    # Statistics of a column before (column_data) and after (cleaned) its decisions were applied
+    present = column_data.notna()
+    rows = len(column_data)
+    filled = int(present.sum())
+    profile = {
+        'rows': rows,
+        'null_fraction': 1 - filled / rows if rows else 0.0,
+        # Share of the filled cells the decisions turned into missing values (empty, invalid, failed conversions)
+        'rejected_fraction': int((cleaned.isna() & present).sum()) / filled if filled else 0.0
+    }
+    if data_type in ('string', 'object'):
+        uniques = column_data[present].unique()
+        profile['distinct_ratio'] = len(uniques) / filled if filled else 0.0
+        categorical = len(uniques) <= PLAN_MAX_KNOWN_VALUES and profile['distinct_ratio'] <= PLAN_MAX_DISTINCT_RATIO
+        profile['known_values'] = _value_keys(uniques) if categorical else None
+    return profile
+
+
+def profile_drift(planned, current, column_data):
+    # Largest change between the planned and the current statistics of a column
+    drift = max(abs(current[key] - planned[key]) for key in ('null_fraction', 'rejected_fraction', 'distinct_ratio')
+                if key in planned and key in current)
+    known_values = planned.get('known_values')
+    if known_values is not None:
+        codes, uniques = pd.factorize(column_data)
+        codes = codes[codes >= 0]
+        if len(codes):
+            unseen_values = ~pd.Index(_value_keys(uniques), dtype=object).isin(_value_keys(known_values))
+            drift = max(drift, int(unseen_values[codes].sum()) / len(codes))
+    return drift
+
+
+class CleaningPlan:
+    # Everything the LLM decided during a run: the header map, removed columns and each column's decisions (type,
+    # empty and invalid values, string transform, low count values) with the statistics they were made on. Applying
+    # a plan to new data of the same source cleans it without LLM calls, except for new and drifted columns
+
+    def __init__(self, header_map=None, removed_columns=None, columns=None, created_at=None,
+                 drift_threshold=PLAN_DRIFT_THRESHOLD):
+        self.header_map = dict(header_map or {})
+        self.removed_columns = list(removed_columns or [])
+        self.columns = dict(columns or {})
+        self.created_at = created_at or time.time()
+        self.drift_threshold = drift_threshold
+
+    @classmethod
+    def load(cls, path, drift_threshold=PLAN_DRIFT_THRESHOLD):
+        with open(path) as f:
+            plan = json.load(f)
+        if plan.get('version') != PLAN_VERSION:
+            raise ValueError(f"Unsupported cleaning plan version in {path}: {plan.get('version')}")
+        return cls(plan['header_map'], plan['removed_columns'], plan['columns'], plan['created_at'], drift_threshold)
+
+    def save(self, path):
+        plan = {
+            'version': PLAN_VERSION,
+            'created_at': self.created_at,
+            'updated_at': time.time(),
+            'header_map': self.header_map,
+            'removed_columns': self.removed_columns,
+            'columns': self.columns
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(plan, f, indent=2, default=_json_default)
+        os.replace(tmp_path, path)
+
+    def subset(self, columns):
+        # The part of the plan a column worker needs
+        return CleaningPlan(self.header_map, self.removed_columns,
+                            {column: self.columns[column] for column in columns if column in self.columns},
+                            self.created_at, self.drift_threshold)
+
+    def headers_for(self, columns):
+        # Planned names for the given input columns, or None if any of them is not in the plan
+        if not self.header_map or any(str(column) not in self.header_map for column in columns):
+            return None
+        return [self.header_map[str(column)] for column in columns]
+
+    def record_headers(self, before, after):
+        self.header_map.update({str(original): name for original, name in zip(before, after)})
+
+    def record_removed_columns(self, columns):
+        self.removed_columns.extend(column for column in columns if column not in self.removed_columns)
+
+    def column_decisions(self, column):
+        entry = self.columns.get(column)
+        return entry['decisions'] if entry is not None else None
+
+    def drift(self, column, column_data, cleaned):
+        entry = self.columns[column]
+        current = column_profile(column_data, cleaned, entry['decisions']['data_type'])
+        return profile_drift(entry['profile'], current, column_data)
+
+    def record_column(self, column, decisions, column_data, cleaned):
+        self.columns[column] = {'decisions': decisions,
+                                'profile': column_profile(column_data, cleaned, decisions['data_type'])}
@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import llm_config
+import metrics
+from clean import clean_data, OPTIMIZE_DTYPES
+from report import create_full_report
+from data_io import INPUT_FORMATS, OUTPUT_FORMATS, read_table, write_table, table_format
+
+SUMMARY_FILE = 'run_summary.json'
+
+# Counters copied into each file's summary
+SUMMARY_COUNTERS = {
+    'llm_requests': 'llm_requests_total',
+    'llm_retries': 'llm_retries_total',
+    'llm_failures': 'llm_failures_total',
+    'llm_cache_hits': 'llm_cache_hits_total',
+    'llm_prompt_tokens': 'llm_prompt_tokens_total',
+    'llm_completion_tokens': 'llm_completion_tokens_total',
+    'llm_parse_failures': 'llm_parse_failures_total'
+}
+
+
+def find_input_files(path, recursive=False):
+    if os.path.isfile(path):
+        return [path]
+    pattern = os.path.join(path, '**', '*') if recursive else os.path.join(path, '*')
+    return sorted(p for p in glob.glob(pattern, recursive=recursive)
+                  if os.path.isfile(p) and os.path.splitext(p)[1].lower() in INPUT_FORMATS)
+
+
+def plan_jobs(input_files, input_root, output_dir, output_format=None):
+    # Outputs mirror the input layout under output_dir; each file also gets a report directory next to its output
+    root = input_root if os.path.isdir(input_root) else os.path.dirname(input_root)
+    jobs = []
+    for input_path in input_files:
+        stem = os.path.splitext(os.path.relpath(input_path, root))[0]
+        fmt = output_format or table_format(input_path)
+        jobs.append({
+            'input': input_path,
+            'output': os.path.join(output_dir, f"{stem}.{fmt}"),
+            'format': fmt,
+            'report_dir': os.path.join(output_dir, f"{stem}_report")
+        })
+    return jobs
+
+
+def _init_job_worker(llm_concurrency):
+    # Jobs split the LLM concurrency budget between them, as column workers do
+    llm_config.set_max_concurrency(llm_concurrency)
+
+
+def run_job(job, report=True, checkpoint_dir=None):
+    # Cleans one file end to end and returns its summary; errors are reported in the summary, not raised
+    summary = dict(job, status='running', started_at=time.time())
+    counters_before = {key: metrics.counter_value(name) for key, name in SUMMARY_COUNTERS.items()}
+    # Cleaning logs go to stderr; stdout carries one JSON line per finished file
+    with contextlib.redirect_stdout(sys.stderr):
+        _clean_file(job, summary, report, checkpoint_dir)
+    summary['seconds'] = time.time() - summary['started_at']
+    summary['metrics'] = {key: metrics.counter_value(name) - counters_before[key] for key, name in SUMMARY_COUNTERS.items()}
+    return summary
+
+
+def _run_job_in_worker(job, report, checkpoint_dir):
+    # The worker's metrics go back to the parent, which owns the sinks
+    metrics.reset()
+    summary = run_job(job, report, checkpoint_dir)
+    return summary, metrics.snapshot()
+
+
+def _clean_file(job, summary, report, checkpoint_dir):
+    try:
+        df = read_table(job['input'])
+        summary['rows_before'], summary['columns_before'] = df.shape
+        result = None
+        # clean_data leaves the input's data alone (only its header is renamed), so the report can compare against it
+        for _, status in clean_data(df, checkpoint_dir=checkpoint_dir, plan=job.get('plan'),
+                                    save_plan=job.get('save_plan'),
+                                    compact_dtypes=job.get('optimize_dtypes', OPTIMIZE_DTYPES)):
+            if isinstance(status, tuple):
+                result = status
+        cleaned_df, nonconforming_cells_before, process_times, removed_columns, removed_rows = result
+
+        os.makedirs(os.path.dirname(job['output']) or '.', exist_ok=True)
+        write_table(cleaned_df, job['output'], job['format'])
+        if report:
+            summary['report_files'] = create_full_report(df, cleaned_df, nonconforming_cells_before, process_times,
+                                                         removed_columns, removed_rows,
+                                                         report_dir=job['report_dir'], workers=1)
+        summary.update({
+            'status': 'done',
+            'rows_after': cleaned_df.shape[0],
+            'columns_after': cleaned_df.shape[1],
+            'removed_rows': int(removed_rows),
+            'removed_columns': int(removed_columns),
+            'nonconforming_cells_before': int(sum(nonconforming_cells_before.values())),
+            'process_times': process_times
+        })
+    except Exception as e:
+        summary.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+
+
+def run_jobs(jobs, workers=1, llm_concurrency=None, report=True, checkpoint_dir=None, on_done=None):
+    # Files run in separate processes (pyplot and the cleaning statistics are per process); the total number
+    # of LLM requests in flight stays within llm_concurrency
+    llm_concurrency = llm_concurrency or llm_config.MAX_CONCURRENT_REQUESTS
+    workers = max(1, min(workers, len(jobs)))
+    summaries = []
+    if workers == 1:
+        llm_config.set_max_concurrency(llm_concurrency)
+        for job in jobs:
+            summaries.append(run_job(job, report, checkpoint_dir))
+            if on_done:
+                on_done(summaries[-1])
+        return summaries
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_job_worker,
+                             initargs=(max(1, llm_concurrency // workers),)) as executor:
+        futures = [executor.submit(_run_job_in_worker, job, report, checkpoint_dir) for job in jobs]
+        for future in as_completed(futures):
+            summary, worker_metrics = future.result()
+            metrics.merge(worker_metrics)
+            summaries.append(summary)
+            if on_done:
+                on_done(summaries[-1])
+    order = {job['input']: i for i, job in enumerate(jobs)}
+    return sorted(summaries, key=lambda summary: order[summary['input']])
+
+
+def write_summary(path, summary):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def clean_command(args):
+    input_files = find_input_files(args.input, args.recursive)
+    jobs = plan_jobs(input_files, args.input, args.output_dir, args.format)
+    for job in jobs:
+        if args.plan:
+            job['plan'] = args.plan
+        if args.save_plans:
+            job['save_plan'] = os.path.splitext(job['output'])[0] + '.plan.json'
+        job['optimize_dtypes'] = args.optimize_dtypes
+    if not args.overwrite:
+        skipped = [job for job in jobs if os.path.exists(job['output'])]
+        jobs = [job for job in jobs if not os.path.exists(job['output'])]
+    else:
+        skipped = []
+
+    summary = {
+        'command': 'clean',
+        'input': args.input,
+        'output_dir': args.output_dir,
+        'dry_run': args.dry_run,
+        'started_at': time.time(),
+        'skipped': [job['input'] for job in skipped]
+    }
+    print(f"Found {len(input_files)} input files, {len(jobs)} to clean, {len(skipped)} already cleaned.",
+          file=sys.stderr)
+
+    if args.dry_run:
+        for job in jobs:
+            job['status'] = 'planned'
+            job['bytes'] = os.path.getsize(job['input'])
+            print(f"  {job['input']} -> {job['output']}", file=sys.stderr)
+        summary['files'] = jobs
+    else:
+        def report_progress(file_summary):
+            print(json.dumps({key: file_summary.get(key) for key in ('input', 'status', 'seconds', 'error')}))
+            sys.stdout.flush()
+
+        summary['files'] = run_jobs(jobs, workers=args.jobs, llm_concurrency=args.llm_concurrency,
+                                    report=args.report, checkpoint_dir=args.checkpoint_dir,
+                                    on_done=report_progress)
+
+    summary['seconds'] = time.time() - summary['started_at']
+    summary['failed'] = sum(1 for file_summary in summary['files'] if file_summary['status'] == 'failed')
+    metrics.flush()
+    summary_path = args.summary or os.path.join(args.output_dir, SUMMARY_FILE)
+    write_summary(summary_path, summary)
+    print(f"Run summary written to {summary_path}", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Clean data files without the web UI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    clean = commands.add_parser('clean', help="Clean a file or every data file in a directory")
+    clean.add_argument('input', help="Input file or directory")
+    clean.add_argument('output_dir', help="Directory for cleaned files, reports and the run summary")
+    clean.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format (default: same as the input)")
+    clean.add_argument('--jobs', type=int, default=1, help="Files cleaned at the same time")
+    clean.add_argument('--llm-concurrency', type=int, default=None,
+                       help="LLM requests in flight across all jobs (default: LLM_MAX_CONCURRENCY)")
+    clean.add_argument('--recursive', action='store_true', help="Include files in subdirectories")
+    clean.add_argument('--overwrite', action='store_true', help="Clean files whose output already exists")
+    clean.add_argument('--no-report', dest='report', action='store_false', help="Skip the visual reports")
+    clean.add_argument('--checkpoint-dir', default=os.getenv('CHECKPOINT_DIR'),
+                       help="Make runs resumable (see Resumable Runs in the README)")
+    clean.add_argument('--plan', help="Apply a saved cleaning plan; only new and drifted columns go to the LLM")
+    clean.add_argument('--save-plans', action='store_true',
+                       help="Write each file's cleaning plan next to its output (OUTPUT.plan.json)")
+    clean.add_argument('--optimize-dtypes', action=argparse.BooleanOptionalAction, default=OPTIMIZE_DTYPES,
+                       help="Store cleaned columns in compact dtypes (narrower numbers, category and Arrow strings); "
+                            "--no-optimize-dtypes overrides OPTIMIZE_DTYPES=1")
+    clean.add_argument('--summary', help=f"Run summary path (default: OUTPUT_DIR/{SUMMARY_FILE})")
+    clean.add_argument('--dry-run', action='store_true', help="List what would be cleaned without cleaning it")
+    clean.set_defaults(handler=clean_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
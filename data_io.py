@@ -0,0 +1,109 @@
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.ipc
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+INPUT_FORMATS = ['.csv', '.parquet', '.feather', '.arrow']
+OUTPUT_FORMATS = ['csv', 'parquet', 'feather', 'arrow']
+
+# Load columns Arrow-backed (pd.ArrowDtype): text as string[pyarrow] instead of Python objects
+ARROW_DTYPES = pa is not None and os.getenv('ARROW_DTYPES', '1').lower() in ('1', 'true', 'yes')
+
+
+def table_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ipc', '.arrows'):
+        return 'arrow'
+    return extension.lstrip('.')
+
+
+def string_columns(df):
+    # Text columns, whether stored as object or as a pandas string dtype (including string[pyarrow])
+    return df.select_dtypes(include=['object', 'string']).columns
+
+
+def _read_arrow(path):
+    # Memory-mapped, so column buffers are read from the page cache without a copy; stream files are read whole
+    source = pa.memory_map(path)
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+def _read_csv_arrow(path):
+    # Multithreaded pyarrow parser. Columns come out as pd.read_csv gives them: dates and timestamps stay text so
+    # the cleaning steps decide their format, and all-empty columns are float NaN. Empty and NA-like strings are
+    # missing values in text columns too, with the same NA tokens pandas uses
+    convert_options = pa.csv.ConvertOptions(strings_can_be_null=True, quoted_strings_can_be_null=True)
+    convert_options.null_values = list(convert_options.null_values) + ['<NA>', 'None']
+    table = pa.csv.read_csv(path, convert_options=convert_options)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_temporal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+        elif pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table
+
+
+def _to_pandas(table, arrow_dtypes):
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def read_table(path, arrow_dtypes=ARROW_DTYPES):
+    fmt = table_format(path)
+    if fmt not in [extension.lstrip('.') for extension in INPUT_FORMATS]:
+        raise ValueError(f"Unsupported input format: {path} (expected one of {', '.join(INPUT_FORMATS)})")
+    if pa is None:
+        if fmt != 'csv':
+            raise ImportError(f"Reading {fmt} files needs pyarrow")
+        return pd.read_csv(path)
+    if fmt == 'csv':
+        table = _read_csv_arrow(path)
+    elif fmt == 'parquet':
+        table = pa.parquet.read_table(path)
+    elif fmt == 'feather':
+        table = pa.feather.read_table(path, memory_map=True)
+    else:
+        table = _read_arrow(path)
+    return _to_pandas(table, arrow_dtypes)
+
+
+def to_arrow_table(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Object columns holding mixed Python types are written as text
+        return pa.Table.from_pandas(df.astype({column: 'string' for column in df.columns[df.dtypes == object]}),
+                                    preserve_index=False)
+
+
+def write_table(df, path, fmt=None):
+    # Parquet, Feather and Arrow keep the cleaned dtypes (Int64, datetime, ...); CSV does not
+    fmt = fmt or table_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return path
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    if pa is None:
+        raise ImportError(f"Writing {fmt} files needs pyarrow")
+    table = to_arrow_table(df)
+    if fmt == 'parquet':
+        pa.parquet.write_table(table, path)
+    elif fmt == 'feather':
+        pa.feather.write_feather(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# String columns with at most this share of distinct values per filled row become category columns
+CATEGORY_MAX_RATIO = 0.5
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_integer(low, high):
+    for integer_type in INTEGER_TYPES:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            return integer_type
+    return np.int64
+
+
+def _integer_dtype(dtype, integer_type):
+    # The same family of dtype (NumPy, nullable or Arrow) with a narrower integer type
+    if isinstance(dtype, pd.ArrowDtype):
+        return pd.ArrowDtype(pa.from_numpy_dtype(integer_type))
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return pd.api.types.pandas_dtype(np.dtype(integer_type).name.capitalize())
+    return np.dtype(integer_type)
+
+
+def _compact_integers(column):
+    present = column.dropna()
+    if present.empty:
+        return column
+    integer_type = _smallest_integer(int(present.min()), int(present.max()))
+    dtype = _integer_dtype(column.dtype, integer_type)
+    return column if dtype == column.dtype else column.astype(dtype)
+
+
+def _compact_floats(column):
+    # float32 only when every value survives the round trip unchanged
+    if column.dtype in (np.float32, 'Float32') or (isinstance(column.dtype, pd.ArrowDtype)
+                                                   and column.dtype.pyarrow_dtype != pa.float64()):
+        return column
+    values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(over='ignore'):
+        narrowed = values.astype(np.float32).astype(np.float64)
+    if not ((narrowed == values) | np.isnan(values)).all():
+        return column
+    if isinstance(column.dtype, pd.ArrowDtype):
+        return column.astype(pd.ArrowDtype(pa.float32()))
+    if isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+        return column.astype('Float32')
+    return column.astype(np.float32)
+
+
+def _compact_strings(column, max_ratio):
+    present = column.dropna()
+    if column.dtype == object and not present.map(lambda value: isinstance(value, str)).all():
+        return column  # mixed Python objects are left as they are
+    if len(present) and present.nunique() <= max_ratio * len(present):
+        return column.astype('category')
+    if column.dtype == object:
+        return column.astype(pd.StringDtype('pyarrow' if pa is not None else 'python'))
+    return column
+
+
+def compact_column(column, category_max_ratio=CATEGORY_MAX_RATIO):
+    dtype = column.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return column
+    if pd.api.types.is_signed_integer_dtype(dtype):
+        return _compact_integers(column)
+    if pd.api.types.is_float_dtype(dtype):
+        return _compact_floats(column)
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return _compact_strings(column, category_max_ratio)
+    return column
+
+
+def optimize_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    # The frame with every column in the most compact dtype that keeps its values: narrower integers, float32
+    # where it is exact, category for repetitive strings and Arrow strings for the rest. Returns the frame and
+    # per-column (dtype before, dtype after, bytes before, bytes after)
+    changes = {}
+    compacted = {}
+    for column in df.columns:
+        before = df[column]
+        after = compact_column(before, category_max_ratio)
+        if after is not before:
+            compacted[column] = after
+            changes[column] = (str(before.dtype), str(after.dtype), int(before.memory_usage(index=False, deep=True)),
+                               int(after.memory_usage(index=False, deep=True)))
+    if compacted:
+        df = df.copy(deep=False)
+        for column, values in compacted.items():
+            df[column] = values
+    return df, changes
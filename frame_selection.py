@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+class FrameSelection:
+    # The rows and columns of a frame that the cleaning steps keep, tracked without copying the frame: a column list
+    # and row positions over the source frame, plus the columns a step has replaced (holding the selected rows only).
+    # frame() materializes the result once, at the end
+
+    def __init__(self, df):
+        self.source = df
+        self.columns = list(df.columns)
+        self.positions = None  # positions of the selected rows in source; None selects them all
+        self.replaced = {}
+
+    def __len__(self):
+        return len(self.source) if self.positions is None else len(self.positions)
+
+    @property
+    def shape(self):
+        return len(self), len(self.columns)
+
+    @property
+    def index(self):
+        return self.source.index if self.positions is None else self.source.index[self.positions]
+
+    def column(self, name):
+        # The selected rows of a column; a view of the source until the column is replaced or rows are dropped
+        if name in self.replaced:
+            return self.replaced[name]
+        column = self.source[name]
+        return column if self.positions is None else column.iloc[self.positions]
+
+    def empty_frame(self):
+        # The selected columns with their current dtypes and no rows, for selecting columns by dtype
+        return pd.DataFrame({name: self.column(name).iloc[:0] for name in self.columns})
+
+    def replace(self, name, values):
+        self.replaced[name] = values
+
+    def keep_columns(self, names):
+        keep = set(names)
+        self.columns = [name for name in self.columns if name in keep]
+        self.replaced = {name: values for name, values in self.replaced.items() if name in keep}
+
+    def keep_rows(self, keep):
+        # keep: boolean array over the selected rows
+        keep = np.asarray(keep, dtype=bool)
+        positions = np.arange(len(self.source)) if self.positions is None else self.positions
+        self.positions = positions[keep]
+        for name in list(self.replaced):
+            self.replaced[name] = self.replaced[name][keep]
+
+    def dropped_rows(self, keep, columns=None):
+        # The rows keep_rows(keep) would drop, as a frame of the given (default: all selected) columns
+        columns = self.columns if columns is None else columns
+        drop = ~np.asarray(keep, dtype=bool)
+        return pd.DataFrame({name: self.column(name)[drop] for name in columns})
+
+    def frame(self):
+        # Each column is taken once; columns a step already replaced are not copied again
+        if not self.columns:
+            return pd.DataFrame(index=self.index)
+        return pd.DataFrame({name: self.column(name) for name in self.columns}, copy=False)
@@ -0,0 +1,275 @@
+import ast
+import hashlib
+import io
+import json
+import os
+import re
+import string
+import threading
+import time
+import tokenize
+import numpy as np
+from llm_prompts import (
+    CHECK_HEADERS_PROMPT,
+    NORMALIZE_HEADERS_PROMPT,
+    CHECK_COLUMN_CONTENT_PROMPT,
+    CHECK_TYPED_COLUMN_CONTENT_PROMPT,
+    CHECK_PACKED_COLUMN_CONTENT_PROMPT,
+    CHECK_TYPO_CLUSTERS_PROMPT,
+    TRANSFORM_STRING_PROMPT,
+    REWRITE_STRING_PROMPT,
+    CHECK_LOW_COUNT_VALUES_PROMPT,
+    DETERMINE_DTYPE_PROMPT
+)
+
+# Backend selection: 'openai' (any OpenAI-compatible endpoint), 'mock', 'replay' or 'record'
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'openai')
+LLM_BASE_URL = os.getenv('LLM_BASE_URL')  # e.g. a local vLLM or Ollama server; None uses api.openai.com
+LLM_REPLAY_PATH = os.getenv('LLM_REPLAY_PATH', 'llm_recording.jsonl')
+
+# Mock backend: fixed latency per request plus seeded jitter, so throughput numbers are reproducible
+MOCK_LATENCY_SECONDS = float(os.getenv('LLM_MOCK_LATENCY', '0.0'))
+MOCK_LATENCY_JITTER = float(os.getenv('LLM_MOCK_JITTER', '0.0'))
+MOCK_SEED = 42
+
+# Share of (row-weighted) values that must conform for the mock to pick a type, as in the prompts
+MOCK_TYPE_THRESHOLD = 0.8
+
+
+class OpenAIBackend:
+    # OpenAI chat completions, or any server exposing the same API through base_url
+
+    def __init__(self, model, temperature, api_key=None, base_url=LLM_BASE_URL):
+        from openai import OpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        # Check if the API key is set (local OpenAI-compatible servers accept any key)
+        if not api_key and base_url is None:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        self.model = model
+        self.temperature = temperature
+        self.retryable_errors = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+        # Retries are handled by llm_config
+        self.client = OpenAI(api_key=api_key or 'none', base_url=base_url, max_retries=0)
+
+    def complete(self, prompt):
+        # Returns (content, token usage or None)
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature
+        )
+        usage = None
+        if response.usage is not None:
+            usage = {'prompt_tokens': response.usage.prompt_tokens, 'completion_tokens': response.usage.completion_tokens}
+        return response.choices[0].message.content.strip(), usage
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class ReplayBackend:
+    # Answers prompts from a JSONL recording. With an inner backend, prompts missing from the recording are sent
+    # to it and appended to the recording (record mode)
+
+    def __init__(self, path=LLM_REPLAY_PATH, inner=None):
+        self.path = path
+        self.inner = inner
+        self.model = inner.model if inner is not None else 'replay'
+        self.retryable_errors = inner.retryable_errors if inner is not None else ()
+        self._lock = threading.Lock()
+        self._responses = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    self._responses[record['key']] = (record['response'], record.get('usage'))
+
+    def complete(self, prompt):
+        key = prompt_key(prompt)
+        with self._lock:
+            recorded = self._responses.get(key)
+        if recorded is not None:
+            return recorded
+        if self.inner is None:
+            raise LookupError(f"Prompt {key[:12]} is not in the recording {self.path}")
+
+        response, usage = self.inner.complete(prompt)
+        line = json.dumps({'key': key, 'prompt': prompt, 'response': response, 'usage': usage,
+                           'recorded_at': time.time()}, ensure_ascii=False)
+        with self._lock:
+            self._responses[key] = (response, usage)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        return response, usage
+
+
+def _matches(prompt, template):
+    # True when every literal part of the template appears in the prompt, in order
+    position = 0
+    for literal_text, _, _, _ in string.Formatter().parse(template):
+        position = prompt.find(literal_text, position)
+        if position < 0:
+            return False
+        position += len(literal_text)
+    return True
+
+
+def _prompt_value(prompt, label, end_label):
+    return prompt.split(label, 1)[1].split(end_label, 1)[0].strip()
+
+
+def _literal(value_repr):
+    # Python reprs of the values sent in prompts; nan, NaT and <NA> read as None and inf as float('inf')
+    try:
+        tokens = []
+        for token in tokenize.generate_tokens(io.StringIO(value_repr.replace('<NA>', 'None')).readline):
+            text = token.string
+            if token.type == tokenize.NAME and text in ('nan', 'NaN', 'NaT'):
+                text = 'None'
+            elif token.type == tokenize.NAME and text == 'inf':
+                text = '1e999'
+            tokens.append((token.type, text))
+        return ast.literal_eval(tokenize.untokenize(tokens))
+    except (SyntaxError, ValueError, tokenize.TokenError):
+        return None
+
+
+def _value_kind(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return 'empty'
+    if isinstance(value, bool):
+        return 'string'
+    if isinstance(value, (int, float)):
+        return 'integer' if float(value).is_integer() else 'float'
+    text = value.strip()
+    if re.fullmatch(r'[+-]?\d+', text):
+        return 'integer'
+    try:
+        float(text)
+        return 'float'
+    except ValueError:
+        pass
+    if re.fullmatch(r'\d{4}-\d{1,2}-\d{1,2}([ T]\d{1,2}:\d{2}(:\d{2})?)?|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}', text):
+        return 'date'
+    return 'string'
+
+
+def mock_type_verdict(values, counts=None, data_type=None):
+    # Rule-based stand-in for the column content prompts: the type covering MOCK_TYPE_THRESHOLD of the non-empty
+    # rows wins (integers also count as floats), otherwise string; data_type, when given, is taken as it is
+    kinds = [_value_kind(value) for value in values]
+    weights = np.ones(len(values)) if counts is None else np.asarray(counts, dtype=float)
+    kinds_array = np.array(kinds, dtype=object)
+    filled = weights[kinds_array != 'empty'].sum()
+    conforming = {
+        'integer': kinds_array == 'integer',
+        'float': np.isin(kinds_array, ['integer', 'float']),
+        'date': kinds_array == 'date'
+    }
+    if data_type is None:
+        data_type = 'string'
+        for candidate in ('integer', 'float', 'date'):
+            if filled and weights[conforming[candidate]].sum() / filled >= MOCK_TYPE_THRESHOLD:
+                data_type = candidate
+                break
+    empty_indices = [i for i, kind in enumerate(kinds) if kind == 'empty']
+    if data_type == 'string':
+        invalid_indices = []
+    else:
+        invalid_indices = [i for i, kind in enumerate(kinds) if kind != 'empty' and not conforming[data_type][i]]
+    return {'data_type': data_type, 'empty_indices': empty_indices, 'invalid_indices': invalid_indices}
+
+
+def _normalize_header(name):
+    name = str(name).lower().strip().replace(' ', '_')
+    return re.sub(r'[^a-z0-9_]', '', name) or '_'
+
+
+class MockBackend:
+    # Deterministic local stand-in: answers each prompt in llm_prompts with rule-based JSON after a configurable
+    # delay. No network access; same prompts give the same answers and the same latencies
+
+    def __init__(self, latency_seconds=MOCK_LATENCY_SECONDS, jitter=MOCK_LATENCY_JITTER, seed=MOCK_SEED):
+        self.model = 'mock'
+        self.retryable_errors = ()
+        self.latency_seconds = latency_seconds
+        self.jitter = jitter
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _latency(self, prompt):
+        if not self.jitter:
+            return self.latency_seconds
+        # Jitter seeded by the prompt, so it does not depend on the order requests arrive in
+        rng = np.random.default_rng([self.seed, int(prompt_key(prompt)[:8], 16)])
+        return self.latency_seconds * (1 + self.jitter * (2 * rng.random() - 1))
+
+    def complete(self, prompt):
+        with self._lock:
+            self.requests += 1
+        latency = self._latency(prompt)
+        if latency > 0:
+            time.sleep(latency)
+        content = json.dumps(self.answer(prompt))
+        # Token usage estimated at four characters per token
+        return content, {'prompt_tokens': len(prompt) // 4 + 1, 'completion_tokens': len(content) // 4 + 1}
+
+    def answer(self, prompt):
+        if _matches(prompt, CHECK_HEADERS_PROMPT):
+            columns = _literal(prompt.split('Columns:', 1)[1].strip()) or []
+            return [i for i, column in enumerate(columns)
+                    if column is None or not str(column).strip() or str(column).startswith('Unnamed:')]
+        if _matches(prompt, NORMALIZE_HEADERS_PROMPT):
+            columns = _literal(prompt.split('Column names:', 1)[1].strip()) or []
+            return {str(column): _normalize_header(column) for column in columns}
+        if _matches(prompt, CHECK_PACKED_COLUMN_CONTENT_PROMPT):
+            results = {}
+            for line in _prompt_value(prompt, 'Batches:', 'Return only').splitlines():
+                key, rest = line.split(':', 1)
+                results[key.strip()] = mock_type_verdict(_literal(rest.split(', values ', 1)[1]) or [])
+            return results
+        if _matches(prompt, CHECK_TYPED_COLUMN_CONTENT_PROMPT):
+            data_type = _prompt_value(prompt, "' holds ", ' values. ')
+            return mock_type_verdict(_literal(_prompt_value(prompt, 'Values:', 'Return only')) or [], data_type=data_type)
+        if _matches(prompt, CHECK_COLUMN_CONTENT_PROMPT):
+            return mock_type_verdict(_literal(_prompt_value(prompt, 'Sample values:', 'Return only')) or [])
+        if _matches(prompt, DETERMINE_DTYPE_PROMPT):
+            values = _literal(_prompt_value(prompt, 'Sample values:', 'Occurrence counts:')) or []
+            counts = _literal(_prompt_value(prompt, 'Occurrence counts:', 'Return only'))
+            if counts is None or len(counts) != len(values):
+                counts = None
+            verdict = mock_type_verdict(values, counts)
+            return {'column_type': verdict['data_type'], 'invalid_indices': verdict['invalid_indices']}
+        if _matches(prompt, CHECK_TYPO_CLUSTERS_PROMPT):
+            # Values at most half as frequent as their cluster's most frequent value are its typos
+            clusters = _literal(_prompt_value(prompt, 'Clusters:', 'Return only')) or []
+            return {'typos': {value: cluster[0][0] for cluster in clusters
+                              for value, count in cluster[1:] if 2 * count <= cluster[0][1]}}
+        if _matches(prompt, TRANSFORM_STRING_PROMPT):
+            values = _literal(_prompt_value(prompt, 'Unique values:', 'Return only')) or []
+            return {value: 'nan' if value.lower() == 'nan' else value.lower()
+                    for value in values if isinstance(value, str)}
+        if _matches(prompt, REWRITE_STRING_PROMPT):
+            return {}
+        if _matches(prompt, CHECK_LOW_COUNT_VALUES_PROMPT):
+            counts = _literal(_prompt_value(prompt, 'Value counts:', 'Return only')) or {}
+            return [value for value, count in counts.items() if count < 2]
+        return {}
+
+
+def create_backend(name=LLM_BACKEND, model=None, temperature=None):
+    if name == 'openai':
+        return OpenAIBackend(model, temperature)
+    if name == 'mock':
+        return MockBackend()
+    if name == 'replay':
+        return ReplayBackend()
+    if name == 'record':
+        return ReplayBackend(inner=OpenAIBackend(model, temperature))
+    raise ValueError(f"Unknown LLM backend: {name} (expected openai, mock, replay or record)")
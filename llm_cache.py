@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.llm_cache.sqlite')
+CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '200000'))
+CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+CACHE_DISABLED = os.getenv('LLM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+# Fraction of CACHE_MAX_ENTRIES kept after an eviction pass, so eviction does not run on every insert
+EVICT_TO_FRACTION = 0.9
+
+
+def make_cache_key(model, temperature, prompt):
+    payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._entries = self._count()
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO responses (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "UPDATE responses SET response = ?, created_at = ?, last_access = ? WHERE key = ?",
+                    (response, now, now, key)
+                )
+            else:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop expired entries first, then the least recently used ones
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        excess = self._count() - int(self.max_entries * EVICT_TO_FRACTION)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+        self._entries = self._count()
+
+    def delete(self, key):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._entries -= cursor.rowcount
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._entries = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': self._entries
+        }
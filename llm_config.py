@@ -1,29 +1,174 @@
 # llm_config.py
 import json
 import os
-from openai import OpenAI
-
-
-# Get the API key from the environment variable
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-
-# Check if the API key is set
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
-
-# Initialize the OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def generate_llm_response(prompt):
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.01
-        )
-        content = response.choices[0].message.content.strip()
-        #print(f"LLM Response: {content}")  # For debugging
-        return content
-    except Exception as e:
-        print(f"Error generating LLM response: {str(e)}")
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import LLMCache, make_cache_key, CACHE_DISABLED
+from llm_backends import create_backend, LLM_BACKEND
+import metrics
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+MODEL = os.getenv('LLM_MODEL', "gpt-4o-mini")
+TEMPERATURE = 0.01
+
+# Maximum number of LLM requests in flight at once (shared by all dispatchers)
+MAX_CONCURRENT_REQUESTS = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+
+# Retry settings for rate limits and transient API errors
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# LLM backend (see llm_backends), created on first use so the module imports without an API key
+backend = None
+_backend_lock = threading.Lock()
+
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Persistent response cache, opened on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+# Tokenizer for prompt budgets, loaded on first use; None falls back to a characters-per-token estimate
+_encoding = None
+CHARS_PER_TOKEN = 4
+
+
+def get_backend():
+    global backend
+    with _backend_lock:
+        if backend is None:
+            backend = create_backend(LLM_BACKEND, model=MODEL, temperature=TEMPERATURE)
+    return backend
+
+
+def set_backend(new_backend):
+    # Swap the backend for this process, e.g. llm_backends.MockBackend() in tests and benchmarks; worker processes
+    # create theirs from LLM_BACKEND
+    global backend
+    with _backend_lock:
+        backend = new_backend
+
+
+def set_max_concurrency(limit):
+    global MAX_CONCURRENT_REQUESTS, _request_slots
+    MAX_CONCURRENT_REQUESTS = max(1, int(limit))
+    _request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def _retry_delay(error, attempt):
+    # Honour the server's Retry-After header when the API sends one
+    response = getattr(error, 'response', None)
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** attempt), BACKOFF_MAX_SECONDS)
+    return delay * (0.5 + random.random() / 2)
+
+
+def estimate_tokens(text):
+    global _encoding
+    if tiktoken is not None and _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(MODEL)
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_cache():
+    global _cache
+    if CACHE_DISABLED:
         return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
+
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+
+def generate_llm_response(prompt, use_cache=True):
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        key = make_cache_key(get_backend().model, TEMPERATURE, prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.increment('llm_cache_hits_total')
+            return cached
+        metrics.increment('llm_cache_misses_total')
+
+    content = _request_completion(prompt)
+    if cache is not None and content is not None:
+        cache.put(key, content)
+    return content
+
+
+def discard_llm_response(prompt):
+    # Drop the cached response to a prompt whose response could not be parsed, so the next call asks again
+    cache = get_cache()
+    if cache is not None:
+        cache.delete(make_cache_key(get_backend().model, TEMPERATURE, prompt))
+
+
+def _record_call(backend, status, seconds, attempt, usage=None, error=None):
+    metrics.increment('llm_requests_total', model=backend.model, status=status)
+    metrics.observe('llm_request_seconds', seconds, model=backend.model)
+    if usage:
+        metrics.increment('llm_prompt_tokens_total', usage.get('prompt_tokens') or 0, model=backend.model)
+        metrics.increment('llm_completion_tokens_total', usage.get('completion_tokens') or 0, model=backend.model)
+    metrics.emit({'type': 'llm_call', 'time': time.time(), 'model': backend.model, 'status': status,
+                  'seconds': seconds, 'attempt': attempt, 'usage': usage, 'error': error})
+
+
+def _request_completion(prompt):
+    backend = get_backend()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with _request_slots:
+                start_time = time.perf_counter()
+                content, usage = backend.complete(prompt)
+            _record_call(backend, 'ok', time.perf_counter() - start_time, attempt, usage)
+            #print(f"LLM Response: {content}")  # For debugging
+            return content
+        except backend.retryable_errors as e:
+            _record_call(backend, 'retryable_error', time.perf_counter() - start_time, attempt, error=type(e).__name__)
+            if attempt == MAX_RETRIES:
+                metrics.increment('llm_failures_total', error=type(e).__name__)
+                print(f"Error generating LLM response after {MAX_RETRIES} retries: {str(e)}")
+                return None
+            metrics.increment('llm_retries_total', error=type(e).__name__)
+            delay = _retry_delay(e, attempt)
+            print(f"LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        except Exception as e:
+            _record_call(backend, 'error', time.perf_counter() - start_time, attempt, error=type(e).__name__)
+            metrics.increment('llm_failures_total', error=type(e).__name__)
+            print(f"Error generating LLM response: {str(e)}")
+            return None
+
+
+def generate_llm_responses(prompts, max_workers=None, use_cache=True):
+    # Run prompts concurrently and return the responses in the order of the prompts
+    prompts = list(prompts)
+    if len(prompts) <= 1:
+        return [generate_llm_response(prompt, use_cache=use_cache) for prompt in prompts]
+
+    workers = min(max_workers or MAX_CONCURRENT_REQUESTS, len(prompts))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda prompt: generate_llm_response(prompt, use_cache=use_cache), prompts))
@@ -31,13 +31,52 @@ Return only a JSON object with the following structure, without any explanation:
 }}
 """
 
-CHECK_TYPOS_PROMPT = """
-Analyze the following sample of values from the column '{column_name}' and identify any potential typos or misspellings.
-For each identified typo, suggest a correction.
+CHECK_TYPED_COLUMN_CONTENT_PROMPT = """
+The column '{column_name}' holds {data_type} values. For the following values from it, identify:
+1. Indices of empty or blank values
+2. Indices of values that are not valid {data_type} values
 
-Sample values:
+Values:
 {sample_values}
 
+Return only a JSON object with the following structure, without any explanation:
+{{
+    "empty_indices": [list of indices of empty or blank values],
+    "invalid_indices": [list of indices of values that are not valid {data_type} values]
+}}
+"""
+
+CHECK_PACKED_COLUMN_CONTENT_PROMPT = """
+Analyze the following batches of values. Each batch holds values from a single column and is identified by its key.
+For every batch, determine:
+1. The most appropriate data type (float, integer, string, or date)
+2. Indices of empty or blank values
+3. Indices of values that don't conform to the determined data type
+Indices are 0-based positions within the batch they belong to.
+
+Batches:
+{batches}
+
+Return only a JSON object with one entry per batch key, with the following structure, without any explanation:
+{{
+    "batch_key": {{
+        "data_type": "detected_type",
+        "empty_indices": [list of indices of empty or blank values],
+        "invalid_indices": [list of indices of values that don't conform to the detected type]
+    }},
+    ...
+}}
+"""
+
+CHECK_TYPO_CLUSTERS_PROMPT = """
+The following clusters of values from the column '{column_name}' are spelled alike. Each cluster lists its values
+with their occurrence counts, the most frequent first.
+For each value that is a typo or misspelling of another value in the same cluster, give that value as its correction.
+Values that are distinct in their own right (different names, codes or abbreviations) must not be mapped.
+
+Clusters:
+{clusters}
+
 Return only a JSON object with the following structure, without any explanation:
 {{
     "typos": {{
@@ -69,14 +108,18 @@ Ensure that each unique string value is assigned a unique integer.
 """
 
 DETERMINE_DTYPE_PROMPT = """
-Analyze the following sample values from a column and determine the most appropriate data type.
+Analyze the following distinct sample values from a column and determine the most appropriate data type.
+Each value is listed once; the occurrence counts (in the same order) give how many rows hold each value.
 Possible types are: float, integer, string, or date.
-If more than 80% of the values conform to a specific type, choose that type.
+If more than 80% of the rows (weighted by the occurrence counts) conform to a specific type, choose that type.
 Otherwise, default to string.
 
 Sample values:
 {sample_values}
 
+Occurrence counts:
+{value_counts}
+
 Return only a JSON object with the following structure, without any explanation:
 {{
     "column_type": "detected_type",
@@ -99,6 +142,24 @@ Return only a JSON object with the following structure, without any explanation:
 }}
 """
 
+REWRITE_STRING_PROMPT = """
+The following unique values from the column '{column_name}' are already lowercased and have their whitespace
+normalized. Identify values that name the same thing as another value in a different form, such as abbreviations,
+synonyms or translations, and map each of them to the most common form.
+
+Unique values:
+{unique_values}
+
+Return only a JSON object with the following structure, without any explanation:
+{{
+    "original_value1": "rewritten_value1",
+    "original_value2": "rewritten_value2",
+    ...
+}}
+
+Include only values that need rewriting. If none do, return an empty object.
+"""
+
 CHECK_LOW_COUNT_VALUES_PROMPT = """
 Analyze the following value counts from the column '{column_name}' and identify values with a count lower than 2.
 
@@ -1,32 +1,52 @@
 import pandas as pd
 import numpy as np
 import json
-from llm_config import generate_llm_response
+from llm_config import generate_llm_response, discard_llm_response
+import metrics
 from llm_prompts import DETERMINE_DTYPE_PROMPT
+from value_index import factorize_column, values_by_frequency, valid_positions, rows_matching
+from type_inference import infer_column_type, record_inference, reset_inference_stats, print_inference_report
 
 SAMPLE_SIZE = 200
 
 
 def determine_column_type(df, column):
-    sample = df[column].sample(n=min(SAMPLE_SIZE, len(df)), random_state=42).tolist()
-    prompt = DETERMINE_DTYPE_PROMPT.format(sample_values=str(sample))
+    # (column type, invalid row labels, date format). Ask about the most frequent distinct values, with their counts,
+    # instead of raw rows; the date format is only known when the type was inferred locally
+    codes, uniques, counts = factorize_column(df[column])
+
+    inferred = infer_column_type(uniques, counts)
+    record_inference(inferred is not None, 1)
+    if inferred is not None:
+        invalid_indices = df.index[rows_matching(codes, inferred['invalid_values'])].tolist()
+        return inferred['data_type'], invalid_indices, inferred['date_format']
+
+    sample_positions = values_by_frequency(counts)[:SAMPLE_SIZE]
+    sample = uniques.iloc[sample_positions].tolist()
+    sample_counts = counts[sample_positions].tolist()
+    prompt = DETERMINE_DTYPE_PROMPT.format(sample_values=str(sample), value_counts=str(sample_counts))
     response = generate_llm_response(prompt)
 
     try:
         result = json.loads(response)
-        return result['column_type'], result['invalid_indices']
-    except (json.JSONDecodeError, KeyError):
+        invalid_values = np.zeros(len(uniques), dtype=bool)
+        invalid_values[valid_positions(result['invalid_indices'], sample_positions)] = True
+        invalid_indices = df.index[rows_matching(codes, invalid_values)].tolist()
+        return result['column_type'], invalid_indices, None
+    except (json.JSONDecodeError, KeyError, TypeError):
+        discard_llm_response(prompt)
+        metrics.increment('llm_parse_failures_total', prompt='determine_dtype')
         print(f"Error parsing LLM response for column {column}")
-        return 'string', []
+        return 'string', [], None
 
 
-def enforce_column_type(df, column, column_type, invalid_indices):
+def enforce_column_type(df, column, column_type, invalid_indices, date_format=None):
     if column_type == 'float':
         df[column] = pd.to_numeric(df[column], errors='coerce')
     elif column_type == 'integer':
         df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
     elif column_type == 'date':
-        df[column] = pd.to_datetime(df[column], errors='coerce')
+        df[column] = pd.to_datetime(df[column], errors='coerce', format=date_format)
 
     # Set invalid values to NaN
     df.loc[invalid_indices, column] = np.nan
@@ -36,16 +56,19 @@ def enforce_column_type(df, column, column_type, invalid_indices):
 
 def process_dataframe(df):
     print("Determining and enforcing column data types...")
+    reset_inference_stats()
 
     for column in df.columns:
         print(f"\nProcessing column: {column}")
-        column_type, invalid_indices = determine_column_type(df, column)
+        column_type, invalid_indices, date_format = determine_column_type(df, column)
         print(f"  Detected type: {column_type}")
         print(f"  Number of invalid values: {len(invalid_indices)}")
 
-        df = enforce_column_type(df, column, column_type, invalid_indices)
+        df = enforce_column_type(df, column, column_type, invalid_indices, date_format)
 
         valid_percentage = (df[column].count() / len(df)) * 100
         print(f"  Percentage of valid values after type enforcement: {valid_percentage:.2f}%")
 
+    print_inference_report()
+
     return df
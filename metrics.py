@@ -0,0 +1,285 @@
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Sinks are enabled by pointing these at files
+METRICS_JSONL_PATH = os.getenv('METRICS_JSONL_PATH')  # every span and LLM call as a JSON line
+METRICS_PROMETHEUS_PATH = os.getenv('METRICS_PROMETHEUS_PATH')  # counters and histograms for the node_exporter textfile collector
+METRICS_SPANS_PATH = os.getenv('METRICS_SPANS_PATH')  # spans in OpenTelemetry JSON form, one per line
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_sinks = []
+_local = threading.local()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(histogram['buckets']):
+            if value <= bound:
+                histogram['counts'][i] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+def emit(event):
+    for sink in list(_sinks):
+        sink.emit(event)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = 'ok'
+        self.start_time = time.time()
+        self.end_time = None
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_frame(self, df, direction='out'):
+        # Rows, columns and cells a stage received ('in') or produced ('out')
+        self.attributes.update({f'rows_{direction}': int(df.shape[0]), f'columns_{direction}': int(df.shape[1]),
+                                f'cells_{direction}': int(df.shape[0] * df.shape[1])})
+
+    def to_dict(self):
+        return {'type': 'span', 'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'start_time': self.start_time, 'end_time': self.end_time,
+                'duration': self.duration, 'status': self.status, 'attributes': self.attributes}
+
+
+def new_trace():
+    # Spans started in this thread from now on belong to a new trace (one per clean_data run)
+    _local.trace_id = uuid.uuid4().hex
+    return _local.trace_id
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, frame=None, **attributes):
+    # Times a block; frame records the shape of the DataFrame going in. Nested spans in the same thread get the
+    # enclosing span as parent
+    stack = _stack()
+    trace_id = getattr(_local, 'trace_id', None) or new_trace()
+    current = Span(name, trace_id, stack[-1].span_id if stack else None, attributes)
+    if frame is not None:
+        current.record_frame(frame, 'in')
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = 'error'
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        stack.remove(current)
+        _finish(current)
+
+
+def record_span(name, seconds, **attributes):
+    # A span timed elsewhere, e.g. in a worker process
+    current = Span(name, getattr(_local, 'trace_id', None) or new_trace(), None, attributes)
+    current.start_time = time.time() - seconds
+    current._start = time.perf_counter() - seconds
+    _finish(current)
+    return current
+
+
+def _finish(current):
+    current.end_time = time.time()
+    current.duration = time.perf_counter() - current._start
+    increment('span_seconds_total', current.duration, span=current.name)
+    increment('span_runs_total', span=current.name, status=current.status)
+    for direction in ('in', 'out'):
+        if f'rows_{direction}' in current.attributes:
+            increment(f'span_rows_{direction}_total', current.attributes[f'rows_{direction}'], span=current.name)
+            increment(f'span_cells_{direction}_total', current.attributes[f'cells_{direction}'], span=current.name)
+    emit(current.to_dict())
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, dict(labels), dict(histogram, counts=list(histogram['counts']))]
+                           for (name, labels), histogram in _histograms.items()]
+        }
+
+
+def merge(other):
+    # Adds a snapshot() taken in another process (column and report workers)
+    with _lock:
+        for name, labels, value in other['counters']:
+            key = _key(name, labels)
+            _counters[key] = _counters.get(key, 0) + value
+        for name, labels, histogram in other['histograms']:
+            key = _key(name, labels)
+            current = _histograms.get(key)
+            if current is None:
+                _histograms[key] = dict(histogram, counts=list(histogram['counts']))
+                continue
+            current['counts'] = [a + b for a, b in zip(current['counts'], histogram['counts'])]
+            current['sum'] += histogram['sum']
+            current['count'] += histogram['count']
+
+
+def counter_value(name, **labels):
+    # Sum over every label set that includes the given labels
+    wanted = {key: str(value) for key, value in labels.items()}
+    with _lock:
+        return sum(value for (counter_name, counter_labels), value in _counters.items()
+                   if counter_name == name and wanted.items() <= dict(counter_labels).items())
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+class JSONLinesSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    def flush(self):
+        pass
+
+
+class SpanSink:
+    # Spans in the OpenTelemetry JSON span layout, so they can be loaded into tracing tools
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        if event['type'] != 'span':
+            return
+        otel_span = {
+            'traceId': event['trace_id'],
+            'spanId': event['span_id'],
+            'parentSpanId': event['parent_id'] or '',
+            'name': event['name'],
+            'startTimeUnixNano': int(event['start_time'] * 1e9),
+            'endTimeUnixNano': int(event['end_time'] * 1e9),
+            'status': {'code': 'STATUS_CODE_ERROR' if event['status'] == 'error' else 'STATUS_CODE_OK'},
+            'attributes': [{'key': key, 'value': {'stringValue': str(value)}}
+                           for key, value in event['attributes'].items()]
+        }
+        line = json.dumps(otel_span)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    def flush(self):
+        pass
+
+
+def _prometheus_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class PrometheusTextfileSink:
+    # Rewrites the whole file on flush; the textfile collector reads it atomically
+
+    def __init__(self, path, prefix='ai_data_cleaner_'):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, event):
+        pass
+
+    def flush(self):
+        lines = []
+        with _lock:
+            counters = sorted(_counters.items())
+            histograms = sorted(_histograms.items(), key=lambda item: item[0])
+        typed = set()
+        for (name, labels), value in counters:
+            metric = self.prefix + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            metric = self.prefix + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                lines.append(f"{metric}_bucket{_prometheus_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{_prometheus_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram['sum']}")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {histogram['count']}")
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
+
+
+def add_sink(sink):
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def flush():
+    for sink in list(_sinks):
+        sink.flush()
+
+
+if METRICS_JSONL_PATH:
+    add_sink(JSONLinesSink(METRICS_JSONL_PATH))
+if METRICS_SPANS_PATH:
+    add_sink(SpanSink(METRICS_SPANS_PATH))
+if METRICS_PROMETHEUS_PATH and multiprocessing.parent_process() is None:
+    # Worker processes send their metrics to the parent (merge) instead of overwriting its textfile
+    add_sink(PrometheusTextfileSink(METRICS_PROMETHEUS_PATH))
+atexit.register(flush)
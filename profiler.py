@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from data_io import string_columns
+
+# Columns converted to one 2D array at a time when profiling float columns
+PROFILE_BLOCK_COLUMNS = 256
+
+
+def _float_block_profile(values):
+    # NaN, inf and distinct counts for every column of a 2D float array at once
+    nan = np.isnan(values)
+    inf = np.isinf(values)
+    ordered = np.sort(values, axis=0)  # NaN sorts last
+    valid = ~np.isnan(ordered)
+    distinct = valid[:1].sum(axis=0) + ((ordered[1:] != ordered[:-1]) & valid[1:]).sum(axis=0)
+    return nan.sum(axis=0), inf.sum(axis=0), distinct
+
+
+def _text_block_profile(block):
+    # Counts for a block of text columns: each column is factorized on its own, so 1, 1.0 and True in different
+    # columns stay distinct values, and the string checks run once on the distinct values of the whole block
+    width = block.shape[1]
+    factorized = [pd.factorize(block.iloc[:, i].to_numpy(dtype=object)) for i in range(width)]
+    sizes = np.array([len(uniques) for _, uniques in factorized], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    nan = np.array([np.count_nonzero(codes < 0) for codes, _ in factorized], dtype=np.int64)
+    codes = np.concatenate([codes[codes >= 0] + offset for (codes, _), offset in zip(factorized, offsets)])
+    counts = np.bincount(codes, minlength=offsets[-1])
+    columns = np.repeat(np.arange(width), sizes)
+
+    uniques = pd.Series(np.concatenate([uniques for _, uniques in factorized]), dtype=object)
+    empty = (uniques == '').to_numpy(dtype=bool)
+    whitespace = uniques.map(lambda value: isinstance(value, str) and value != '' and not value.strip()).to_numpy(dtype=bool)
+    value_counts = [pd.Series(counts[start:end], index=pd.Index(uniques.to_numpy()[start:end]))
+                    for start, end in zip(offsets[:-1], offsets[1:])]
+    return {
+        'nan': nan,
+        'empty': np.bincount(columns, weights=counts * empty, minlength=width).astype('int64'),
+        'whitespace': np.bincount(columns, weights=counts * whitespace, minlength=width).astype('int64'),
+        'distinct': sizes,
+        'value_counts': value_counts
+    }
+
+
+def profile_frame(df, block_columns=PROFILE_BLOCK_COLUMNS):
+    # Per-column NaN, inf, empty string, whitespace-only and distinct counts in one pass over the frame, plus value
+    # counts (in first-seen order) of the text columns for later stages to reuse
+    columns = df.columns
+    profile = {name: pd.Series(0, index=columns, dtype='int64') for name in ('nan', 'inf', 'empty', 'whitespace', 'distinct')}
+    profile['value_counts'] = {}
+
+    text_columns = set(string_columns(df))
+    float_positions = [i for i, dtype in enumerate(df.dtypes) if dtype.kind == 'f']
+    other_positions = [i for i, dtype in enumerate(df.dtypes) if dtype.kind != 'f' and columns[i] not in text_columns]
+
+    for start in range(0, len(float_positions), block_columns):
+        positions = float_positions[start:start + block_columns]
+        values = df.iloc[:, positions].to_numpy(dtype=float, na_value=np.nan)
+        nan, inf, distinct = _float_block_profile(values)
+        for name, counts in (('nan', nan), ('inf', inf), ('distinct', distinct)):
+            profile[name].iloc[positions] = counts
+
+    for start in range(0, len(other_positions), block_columns):
+        positions = other_positions[start:start + block_columns]
+        block = df.iloc[:, positions]
+        profile['nan'].iloc[positions] = block.isna().sum().to_numpy()
+        profile['distinct'].iloc[positions] = block.nunique().to_numpy()
+
+    text_positions = [i for i, column in enumerate(columns) if column in text_columns]
+    for start in range(0, len(text_positions), block_columns):
+        positions = text_positions[start:start + block_columns]
+        block_profile = _text_block_profile(df.iloc[:, positions])
+        for name in ('nan', 'empty', 'whitespace', 'distinct'):
+            profile[name].iloc[positions] = block_profile[name]
+        profile['value_counts'].update(zip(columns[positions], block_profile['value_counts']))
+    return profile
+
+
+def nonconforming_counts(profile):
+    # Missing, infinite and empty string cells per column
+    total = profile['nan'] + profile['inf'] + profile['empty']
+    return {column: int(count) for column, count in total.items()}
+
+
+def rename_profile(profile, old_columns, new_columns):
+    # Follow a header rename that keeps the column order
+    mapping = dict(zip(old_columns, new_columns))
+    renamed = {name: counts.rename(index=mapping) for name, counts in profile.items() if name != 'value_counts'}
+    renamed['value_counts'] = {mapping.get(column, column): counts for column, counts in profile['value_counts'].items()}
+    return renamed
+
+
+def remove_rows_from_counts(value_counts, removed_rows):
+    # Value counts after dropping rows, from the counts of the dropped rows alone
+    adjusted = {}
+    for column, counts in value_counts.items():
+        if column not in removed_rows.columns:
+            continue
+        removed = removed_rows[column].value_counts()
+        if len(removed):
+            # Every removed value is among the counted ones, so the counts keep their order
+            counts = counts - removed.reindex(counts.index, fill_value=0).to_numpy()
+            counts = counts[counts > 0]
+        adjusted[column] = counts
+    return adjusted
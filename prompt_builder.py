@@ -0,0 +1,50 @@
+import os
+import numpy as np
+import metrics
+from llm_config import estimate_tokens
+
+# Prompts whose payload (unique values, value counts, column names) would take more tokens than this are split
+# into several requests, each carrying part of the payload
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '8000'))
+
+# A payload that needs more requests than this is not sent at all
+PROMPT_MAX_REQUESTS = int(os.getenv('PROMPT_MAX_REQUESTS', '32'))
+
+
+def _render(template, field, items, as_dict, fields):
+    payload = dict(items) if as_dict else list(items)
+    return template.format(**{field: payload}, **fields)
+
+
+def _item_chars(item, as_dict):
+    # Characters an item adds to the payload, separator included
+    if as_dict:
+        return len(repr(item[0])) + len(repr(item[1])) + 4
+    return len(repr(item)) + 2
+
+
+def split_prompts(template, field, items, as_dict=False, token_budget=PROMPT_TOKEN_BUDGET, **fields):
+    # Renders template with items in its payload field, split into as many prompts as keep each within about
+    # token_budget. items are values, or (key, value) pairs when as_dict. Returns (position of the first item,
+    # prompt) pairs, or None when more than PROMPT_MAX_REQUESTS prompts would be needed. A payload that fits gives
+    # the same single prompt as formatting the template directly
+    items = list(items)
+    prompt = _render(template, field, items, as_dict, fields)
+    tokens = estimate_tokens(prompt)
+    if tokens <= token_budget or len(items) <= 1:
+        return [(0, prompt)]
+
+    base = _render(template, field, [], as_dict, fields)
+    base_tokens = estimate_tokens(base)
+    # Characters per token of this payload, measured on the whole of it
+    chars_per_token = max(len(prompt) - len(base), 1) / max(tokens - base_tokens, 1)
+    budget_chars = max((token_budget - base_tokens) * chars_per_token, 1)
+    sizes = np.fromiter((_item_chars(item, as_dict) for item in items), dtype=np.int64, count=len(items))
+    chunks = ((np.cumsum(sizes) - 1) // budget_chars).astype(np.int64)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(chunks)) + 1])
+    if len(starts) > PROMPT_MAX_REQUESTS:
+        return None
+
+    ends = np.append(starts[1:], len(items))
+    metrics.increment('llm_split_requests_total', len(starts))
+    return [(int(start), _render(template, field, items[start:end], as_dict, fields)) for start, end in zip(starts, ends)]
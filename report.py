@@ -1,112 +1,197 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
 import seaborn as sns
 import matplotlib.pyplot as plt
 from datetime import datetime
 
 REPORT_DIR = f"cleaning_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-os.makedirs(REPORT_DIR, exist_ok=True)
 
-def save_plot(fig, filename):
-    fig.savefig(os.path.join(REPORT_DIR, filename), dpi=400, bbox_inches='tight')
+# Rendering settings
+REPORT_DPI = int(os.getenv('REPORT_DPI', '150'))
+REPORT_FORMAT = os.getenv('REPORT_FORMAT', 'png')
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Row counts are aggregated before drawing, so render time does not grow with the data
+HEATMAP_MAX_ROWS = 500
+HISTOGRAM_BINS = 50
+KDE_SAMPLE_SIZE = 5000
+KDE_GRID_POINTS = 200
+
+
+def _init_report_style(dpi=REPORT_DPI):
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.dpi'] = dpi
+
+
+def save_plot(fig, filename, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"{os.path.splitext(filename)[0]}.{fmt}")
+    fig.savefig(path, dpi=dpi, format=fmt, bbox_inches='tight')
     plt.close(fig)
+    return path
 
-def plot_heatmap(df, title):
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(df.isnull(), cbar=False, cmap='Reds')
-    plt.title(title)
-    plt.tight_layout()
-    save_plot(plt.gcf(), f'{title.lower().replace(" ", "_")}.png')
+
+def _numeric_values(series):
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+# Summaries: computed in the main process with vectorized reductions; each is small whatever the row count
+
+def summarize_missing(df, max_rows=HEATMAP_MAX_ROWS):
+    # Share of missing cells per column in up to max_rows consecutive row bins
+    missing = df.isna().to_numpy()
+    num_rows = len(df)
+    num_bins = max(min(max_rows, num_rows), 1)
+    starts = np.unique(np.arange(num_bins) * num_rows // num_bins)
+    if num_rows == 0:
+        return pd.DataFrame(columns=df.columns, dtype=float)
+    sizes = np.diff(np.append(starts, num_rows))
+    fractions = np.add.reduceat(missing, starts, axis=0) / sizes[:, None]
+    return pd.DataFrame(fractions, index=starts, columns=df.columns)
 
 
-def plot_valid_data_percentage(original_df, cleaned_df):
+def summarize_valid_data_percentage(original_df, cleaned_df):
     original_valid = (original_df.notna().sum() / len(original_df)) * 100
     cleaned_valid = (cleaned_df.notna().sum() / len(cleaned_df)) * 100
-    
+
     # Combine the data and fill missing values with 0
-    combined_data = pd.concat([original_valid, cleaned_valid], axis=1, keys=['Original', 'Cleaned']).fillna(0)
-    
+    return pd.concat([original_valid, cleaned_valid], axis=1, keys=['Original', 'Cleaned']).fillna(0)
+
+
+def _kde(values, grid, scale, sample_size=KDE_SAMPLE_SIZE):
+    # Gaussian KDE (Scott's bandwidth) fitted on a fixed-size sample, scaled to histogram counts
+    if len(values) < 2:
+        return np.zeros_like(grid)
+    if len(values) > sample_size:
+        values = np.random.default_rng(42).choice(values, sample_size, replace=False)
+    bandwidth = values.std() * len(values) ** (-1 / 5)
+    if bandwidth == 0:
+        return np.zeros_like(grid)
+    density = np.exp(-0.5 * ((grid[:, None] - values[None, :]) / bandwidth) ** 2).mean(axis=1)
+    return density / (bandwidth * np.sqrt(2 * np.pi)) * scale
+
+
+def summarize_column_distributions(original_df, cleaned_df, bins=HISTOGRAM_BINS):
+    summaries = []
+    for column in original_df.select_dtypes(include=[np.number]).columns:
+        if column not in cleaned_df.columns:
+            continue
+        before = _numeric_values(original_df[column])
+        after = _numeric_values(cleaned_df[column])
+        both = np.concatenate([before, after])
+        if len(both) == 0:
+            continue
+        edges = np.histogram_bin_edges(both, bins=bins)
+        width = edges[1] - edges[0]
+        grid = np.linspace(edges[0], edges[-1], KDE_GRID_POINTS)
+        summaries.append({
+            'column': column,
+            'edges': edges,
+            'before': np.histogram(before, bins=edges)[0],
+            'after': np.histogram(after, bins=edges)[0],
+            'grid': grid,
+            'kde_before': _kde(before, grid, len(before) * width),
+            'kde_after': _kde(after, grid, len(after) * width)
+        })
+    return summaries
+
+
+# Drawing: takes only the small summaries, so figures can be rendered in worker processes
+
+def draw_heatmap(missing_fractions, title, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(missing_fractions, cmap='Reds', vmin=0, vmax=1, cbar_kws={'label': 'Share of missing values'})
+    plt.ylabel('Row')
+    plt.title(title)
+    plt.tight_layout()
+    return save_plot(plt.gcf(), f'{title.lower().replace(" ", "_")}.png', report_dir, dpi, fmt)
+
+
+def draw_valid_data_percentage(combined_data, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     plt.figure(figsize=(15, 8))
-    
+
     x = range(len(combined_data))
     width = 0.35
-    
+
     plt.bar(x, combined_data['Original'], width, label='Before Cleaning', alpha=0.8)
     plt.bar([i + width for i in x], combined_data['Cleaned'], width, label='After Cleaning', alpha=0.8)
-    
+
     plt.xlabel('Columns')
     plt.ylabel('Percentage of Valid Data')
     plt.title('Percentage of Valid Data Before and After Cleaning')
     plt.xticks([i + width/2 for i in x], combined_data.index, rotation=90)
     plt.legend()
-    
+
     # Add percentage labels on the bars with smaller font size
     for i, v in enumerate(combined_data['Original']):
         plt.text(i, v, f'{v:.1f}%', ha='center', va='bottom', fontsize=6)
     for i, v in enumerate(combined_data['Cleaned']):
         plt.text(i + width, v, f'{v:.1f}%', ha='center', va='bottom', fontsize=6)
-    
+
     plt.tight_layout()
-    plt.savefig(os.path.join(REPORT_DIR, 'valid_data_percentage.png'))
-    plt.close()
+    return save_plot(plt.gcf(), 'valid_data_percentage.png', report_dir, dpi, fmt)
+
 
-def plot_column_schemas(df):
-    schemas = df.dtypes.astype(str).value_counts()
+def draw_column_schemas(schemas, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     fig, ax = plt.subplots(figsize=(10, 6))
-    
+
     # Generate a color palette with as many colors as there are bars
     colors = plt.cm.rainbow(np.linspace(0, 1, len(schemas)))
-    
+
     # Plot the bars
     bars = ax.bar(schemas.index, schemas.values, color=colors)
-    
+
     ax.set_title('Column Data Types')
     ax.set_xlabel('Data Type')
     ax.set_ylabel('Count')
-    
+
     # Add value labels on top of each bar
     for bar in bars:
         height = bar.get_height()
         ax.text(bar.get_x() + bar.get_width()/2., height,
                 f'{height}',
                 ha='center', va='bottom')
-    
-    save_plot(fig, 'column_schemas.png')
 
-def plot_nonconforming_cells(nonconforming_cells):
+    return save_plot(fig, 'column_schemas.png', report_dir, dpi, fmt)
+
+
+def plot_nonconforming_cells(nonconforming_cells, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     # Ensure that nonconforming_cells is a dictionary
     if isinstance(nonconforming_cells, dict):
         # Proceed with plotting if it's a dictionary
         fig, ax = plt.subplots(figsize=(12, 6))
-        
+
         # Generate a color palette with as many colors as there are bars
         colors = plt.cm.rainbow(np.linspace(0, 1, len(nonconforming_cells)))
-        
+
         # Plot the bars
         bars = ax.bar(list(nonconforming_cells.keys()), list(nonconforming_cells.values()), color=colors)
-        
+
         ax.set_title('Nonconforming Cells by Column')
         ax.set_xlabel('Columns')
         ax.set_ylabel('Number of Nonconforming Cells')
         plt.xticks(rotation=90)
-        
+
         # Add value labels on top of each bar
         for bar in bars:
             height = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2., height,
                     f'{height:,}',
                     ha='center', va='bottom')
-        
-        save_plot(fig, 'nonconforming_cells.png')
+
+        return save_plot(fig, 'nonconforming_cells.png', report_dir, dpi, fmt)
     else:
         print(f"Expected nonconforming_cells to be a dictionary, but got {type(nonconforming_cells)}.")
 
 
-
-def plot_column_distributions(original_df, cleaned_df):
-    numeric_columns = original_df.select_dtypes(include=[np.number]).columns
-    num_columns = len(numeric_columns)
+def draw_column_distributions(summaries, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    num_columns = len(summaries)
 
     if num_columns == 0:
         print("No numeric columns found for distribution plots.")
@@ -114,24 +199,27 @@ def plot_column_distributions(original_df, cleaned_df):
 
     # Create subplots for distributions
     fig, axes = plt.subplots(nrows=(num_columns + 2) // 3, ncols=3, figsize=(18, 5 * ((num_columns + 2) // 3)))
-    axes = axes.flatten() if num_columns > 1 else [axes]
-
-    for i, column in enumerate(numeric_columns):
-        if column in cleaned_df.columns:
-            sns.histplot(original_df[column].dropna(), ax=axes[i], kde=True, color='blue', label='Before Cleaning', alpha=0.5)
-            sns.histplot(cleaned_df[column].dropna(), ax=axes[i], kde=True, color='orange', label='After Cleaning', alpha=0.5)
-            axes[i].set_title(f'{column} - Distribution Before & After Cleaning')
-            axes[i].legend()
+    axes = axes.flatten()
+
+    for i, summary in enumerate(summaries):
+        ax = axes[i]
+        ax.stairs(summary['before'], summary['edges'], fill=True, color='blue', alpha=0.5, label='Before Cleaning')
+        ax.stairs(summary['after'], summary['edges'], fill=True, color='orange', alpha=0.5, label='After Cleaning')
+        ax.plot(summary['grid'], summary['kde_before'], color='blue')
+        ax.plot(summary['grid'], summary['kde_after'], color='orange')
+        ax.set_title(f"{summary['column']} - Distribution Before & After Cleaning")
+        ax.set_ylabel('Count')
+        ax.legend()
 
     # Remove any unused subplots
-    for j in range(i + 1, len(axes)):
+    for j in range(num_columns, len(axes)):
         fig.delaxes(axes[j])
 
     plt.tight_layout()
-    save_plot(fig, 'distributions_before_after_cleaning.png')
+    return save_plot(fig, 'distributions_before_after_cleaning.png', report_dir, dpi, fmt)
 
 
-def plot_boxplot_with_outliers(df):
+def plot_boxplot_with_outliers(df, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     print("Plotting boxplots with outliers...")
     numeric_columns = df.select_dtypes(include=[np.number]).columns
     num_columns = len(numeric_columns)
@@ -153,25 +241,18 @@ def plot_boxplot_with_outliers(df):
         fig.delaxes(axes[j])
 
     plt.tight_layout()
-    save_plot(fig, 'boxplots_with_outliers.png')
-
-
-def plot_correlation_heatmap(df):
-    # Select only numeric, float, and integer columns
-    numeric_df = df.select_dtypes(include=[np.number])
+    return save_plot(fig, 'boxplots_with_outliers.png', report_dir, dpi, fmt)
 
-    # Compute the correlation matrix
-    correlation_matrix = numeric_df.corr()
 
+def draw_correlation_heatmap(correlation_matrix, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     # Plot the heatmap
     fig, ax = plt.subplots(figsize=(15, 10))
     sns.heatmap(correlation_matrix, annot=True, fmt=".2f", cmap='coolwarm', ax=ax, cbar_kws={'label': 'Correlation'})
     ax.set_title('Correlation Heatmap')
-    save_plot(fig, 'correlation_heatmap.png')
-
+    return save_plot(fig, 'correlation_heatmap.png', report_dir, dpi, fmt)
 
 
-def plot_process_times(process_times):
+def plot_process_times(process_times, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
     # Convert seconds to minutes
     process_times_minutes = {k: v / 60 for k, v in process_times.items()}
 
@@ -206,34 +287,61 @@ def plot_process_times(process_times):
     fig.suptitle(f'Process Times (Total: {total_time:.2f} minutes)', fontsize=16)
 
     plt.tight_layout()
-    save_plot(fig, 'process_times.png')
+    return save_plot(fig, 'process_times.png', report_dir, dpi, fmt)
 
 
-def create_full_report(original_df, cleaned_df, nonconforming_cells_before, process_times, removed_columns, removed_rows):
-    os.makedirs(REPORT_DIR, exist_ok=True)
+# DataFrame-level entry points, drawn in the calling process
 
-    sns.set_style("whitegrid")
-    plt.rcParams['figure.dpi'] = 400
+def plot_heatmap(df, title, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    return draw_heatmap(summarize_missing(df), title, report_dir, dpi, fmt)
 
-    print("Plotting valid data percentages...")
-    plot_valid_data_percentage(original_df, cleaned_df)
 
-    print("Plotting column schemas...")
-    plot_column_schemas(cleaned_df)
+def plot_valid_data_percentage(original_df, cleaned_df, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    return draw_valid_data_percentage(summarize_valid_data_percentage(original_df, cleaned_df), report_dir, dpi, fmt)
 
-    print("Plotting nonconforming cells before cleaning...")
-    plot_nonconforming_cells(nonconforming_cells_before)
 
-    print("Plotting column distributions...")
-    plot_column_distributions(original_df, cleaned_df)
+def plot_column_schemas(df, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    return draw_column_schemas(df.dtypes.astype(str).value_counts(), report_dir, dpi, fmt)
 
-    print("Plotting process times...")
-    plot_process_times(process_times)
 
-    print("Plotting heatmaps...")
-    plot_heatmap(original_df, "Missing Values Before Cleaning")
+def plot_column_distributions(original_df, cleaned_df, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    return draw_column_distributions(summarize_column_distributions(original_df, cleaned_df), report_dir, dpi, fmt)
 
-    print("Plotting correlation heatmap...")
-    plot_correlation_heatmap(cleaned_df)
 
-    print(f"All visualization reports saved in directory: {REPORT_DIR}")
\ No newline at end of file
+def plot_correlation_heatmap(df, report_dir=REPORT_DIR, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    # Select only numeric, float, and integer columns
+    return draw_correlation_heatmap(df.select_dtypes(include=[np.number]).corr(), report_dir, dpi, fmt)
+
+
+def _render(task):
+    draw, args = task
+    return draw(*args)
+
+
+def create_full_report(original_df, cleaned_df, nonconforming_cells_before, process_times, removed_columns, removed_rows,
+                       report_dir=REPORT_DIR, workers=REPORT_WORKERS, dpi=REPORT_DPI, fmt=REPORT_FORMAT):
+    os.makedirs(report_dir, exist_ok=True)
+    _init_report_style(dpi)
+
+    print("Summarizing data for the report...")
+    tasks = [
+        (draw_valid_data_percentage, (summarize_valid_data_percentage(original_df, cleaned_df), report_dir, dpi, fmt)),
+        (draw_column_schemas, (cleaned_df.dtypes.astype(str).value_counts(), report_dir, dpi, fmt)),
+        (plot_nonconforming_cells, (nonconforming_cells_before, report_dir, dpi, fmt)),
+        (draw_column_distributions, (summarize_column_distributions(original_df, cleaned_df), report_dir, dpi, fmt)),
+        (plot_process_times, (process_times, report_dir, dpi, fmt)),
+        (draw_heatmap, (summarize_missing(original_df), "Missing Values Before Cleaning", report_dir, dpi, fmt)),
+        (draw_correlation_heatmap, (cleaned_df.select_dtypes(include=[np.number]).corr(), report_dir, dpi, fmt))
+    ]
+
+    print(f"Rendering {len(tasks)} plots ({workers} workers, {dpi} dpi, {fmt})...")
+    if workers > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_report_style, initargs=(dpi,)) as executor:
+            paths = list(executor.map(_render, tasks))
+    else:
+        paths = [_render(task) for task in tasks]
+
+    print(f"All visualization reports saved in directory: {report_dir}")
+    return [path for path in paths if path]
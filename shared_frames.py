@@ -0,0 +1,104 @@
+import gc
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _to_arrow(df):
+    if pa is None:
+        return None
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Mixed-type object columns have no Arrow equivalent
+        return None
+
+
+def _write_stream(sink, table):
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _restore_dtypes(table, object_columns, arrow_columns):
+    # Arrow hands missing strings back as None, where the pipeline expects NaN, and reads Arrow-backed columns
+    # as NumPy or nullable ones unless they are wrapped again
+    df = table.to_pandas()
+    for column in object_columns:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    for column in arrow_columns:
+        df[column] = pd.arrays.ArrowExtensionArray(table.column(column))
+    return df
+
+
+def _special_columns(df):
+    # (object columns, Arrow-backed columns)
+    return (df.columns[df.dtypes == object].tolist(),
+            [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.ArrowDtype)])
+
+
+def share_frame(df):
+    # Put a frame in shared memory as an Arrow IPC stream so a worker process can read it without a pickled copy.
+    # Returns (handle, block); the caller unlinks the block once the worker is done. Frames Arrow can't represent
+    # travel pickled inside the handle, with no block.
+    table = _to_arrow(df)
+    if table is None:
+        return ('pickle', df), None
+    mock = pa.MockOutputStream()
+    _write_stream(mock, table)
+    size = mock.size()
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    _write_stream(pa.FixedSizeBufferWriter(pa.py_buffer(block.buf)), table)
+    return ('arrow', block.name, size) + _special_columns(df), block
+
+
+def open_shared_frame(handle):
+    # Returns (frame, block). Arrow-backed and numeric columns are read in place and point into the block, so the
+    # block stays open while the frame is in use; close it with close_shared_frame once the frame is dropped
+    if handle[0] == 'pickle':
+        return handle[1], None
+    _, name, size, object_columns, arrow_columns = handle
+    # Workers share the parent's resource tracker, so the block stays registered until the parent unlinks it
+    block = shared_memory.SharedMemory(name=name)
+    table = pa.ipc.open_stream(pa.py_buffer(block.buf)[:size]).read_all()
+    return _restore_dtypes(table, object_columns, arrow_columns), block
+
+
+def close_shared_frame(block):
+    # Unmap the block in this process. Frames read from it must be dropped first; a reference cycle can still hold
+    # one, so collect before closing
+    if block is None:
+        return
+    gc.collect()
+    try:
+        block.close()
+    except BufferError:
+        # Still in use, e.g. by the traceback of a failed worker; the mapping goes with the last reference
+        print(f"Shared block {block.name} is still referenced, leaving it mapped")
+
+
+def release_shared_frame(block):
+    if block is not None:
+        block.close()
+        block.unlink()
+
+
+def frame_to_bytes(df):
+    # Serialized form for sending a result back to the parent process
+    table = _to_arrow(df)
+    if table is None:
+        return ('pickle', df)
+    sink = pa.BufferOutputStream()
+    _write_stream(sink, table)
+    return ('arrow', sink.getvalue().to_pybytes()) + _special_columns(df)
+
+
+def frame_from_bytes(payload):
+    if payload[0] == 'pickle':
+        return payload[1]
+    _, data, object_columns, arrow_columns = payload
+    return _restore_dtypes(pa.ipc.open_stream(data).read_all(), object_columns, arrow_columns)
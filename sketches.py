@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# KLL sketch size; larger k gives tighter quantiles at the cost of memory (about 3k values per column)
+QUANTILE_SKETCH_K = 400
+SKETCH_SEED = 42
+
+
+def kll_rank_error(k=QUANTILE_SKETCH_K):
+    # Normalized rank error of a single quantile at 99% confidence (empirical KLL bound from Apache DataSketches)
+    return 2.296 / k ** 0.9723
+
+
+class QuantileSketch:
+    # Mergeable KLL quantile sketch; compaction uses a seeded generator so repeated runs give identical results
+
+    def __init__(self, k=QUANTILE_SKETCH_K, seed=SKETCH_SEED):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            # Keep every other sorted item at twice the weight; an odd item out stays on this level
+            items = np.sort(items)
+            odd = len(items) % 2
+            offset = self._rng.integers(2)
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[odd + offset::2]])
+            self.levels[level] = items[:odd]
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        if self.n == 0:
+            return np.nan
+        if self.is_exact():
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return float(np.interp(q, positions, values))
+
+
+class NonNullCounter:
+    # Mergeable per-column row and non-null counts
+
+    def __init__(self):
+        self.rows = 0
+        self.counts = pd.Series(dtype='int64')
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        self.counts = self.counts.add(chunk.notna().sum(), fill_value=0).astype('int64')
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.counts = self.counts.add(other.counts, fill_value=0).astype('int64')
+        return self
+
+    def columns_with_valid_share(self, threshold):
+        # Same rule as DataFrame.dropna(axis=1, thresh=int(rows * threshold))
+        return self.counts.index[self.counts >= int(self.rows * threshold)].tolist()
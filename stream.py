@@ -0,0 +1,166 @@
+import time
+import numpy as np
+import pandas as pd
+from clean import (
+    EMPTY_THRESHOLD,
+    check_and_normalize_column_headers,
+    calculate_nonconforming_cells,
+    decide_column,
+    apply_column_decisions,
+    iqr_bounds,
+    outlier_masks
+)
+from data_io import string_columns
+from sketches import QuantileSketch, NonNullCounter, kll_rank_error
+from type_inference import reset_inference_stats, print_inference_report
+
+CHUNK_SIZE = 100000
+SAMPLE_ROWS = 20000
+
+
+# Each stage below takes and yields DataFrame chunks, so only one chunk is held in memory at a time
+
+def read_csv_chunks(path, column_positions, column_names, dtype=None, chunksize=CHUNK_SIZE):
+    for chunk in pd.read_csv(path, usecols=column_positions, dtype=dtype, chunksize=chunksize):
+        chunk.columns = column_names
+        yield chunk
+
+
+def drop_empty_rows(chunks, stats, threshold=EMPTY_THRESHOLD):
+    for chunk in chunks:
+        kept = chunk.dropna(axis=0, thresh=int(chunk.shape[1] * threshold))
+        stats['empty_rows'] += len(chunk) - len(kept)
+        # The later steps write columns into the chunk, which pandas would otherwise flag as a copy of a slice
+        yield kept.copy()
+
+
+def null_low_count_values(chunks, low_count_values):
+    for chunk in chunks:
+        for column, values in low_count_values.items():
+            chunk[column] = chunk[column].mask(chunk[column].isin(values))
+        yield chunk
+
+
+def apply_decisions(chunks, decisions):
+    for chunk in chunks:
+        for column, column_decisions in decisions.items():
+            chunk[column], _ = apply_column_decisions(chunk[column], column_decisions)
+        yield chunk
+
+
+def drop_outliers(chunks, bounds, stats):
+    for chunk in chunks:
+        row_mask, column_counts = outlier_masks(chunk, bounds)
+        stats['outlier_rows'] += int(row_mask.sum())
+        stats['outlier_cells'] = stats['outlier_cells'].add(column_counts, fill_value=0).astype('int64')
+        yield chunk[~row_mask]
+
+
+def count_string_values(chunks, text_columns, stats):
+    # Exact value counts over the whole file; memory grows with cardinality, not row count
+    value_counts = {column: pd.Series(dtype='int64') for column in text_columns}
+    for chunk in chunks:
+        stats['rows'] += len(chunk)
+        for column in text_columns:
+            value_counts[column] = value_counts[column].add(chunk[column].value_counts(), fill_value=0)
+    return {column: counts.astype('int64') for column, counts in value_counts.items()}
+
+
+def clean_csv_streaming(input_path, output_path, chunksize=CHUNK_SIZE, sample_rows=SAMPLE_ROWS):
+    process_times = {}
+    stats = {'empty_rows': 0, 'outlier_rows': 0, 'outlier_cells': pd.Series(dtype='int64')}
+    reset_inference_stats()
+
+    print("Starting streaming data validation and cleaning...")
+
+    # Step 1: Normalize column headers (decided on a sample)
+    step_start_time = time.time()
+    sample = pd.read_csv(input_path, nrows=sample_rows)
+    raw_columns = list(sample.columns)
+    nonconforming_cells_before = calculate_nonconforming_cells(sample)
+    sample = check_and_normalize_column_headers(sample)
+    process_times['Normalize headers'] = time.time() - step_start_time
+    yield 0.05, "Normalized headers"
+
+    # Step 2: Remove empty columns (exact non-null counts over the whole file)
+    step_start_time = time.time()
+    original_sample = sample
+    print(f"Removing columns with less than {EMPTY_THRESHOLD * 100}% valid data...")
+    counter = NonNullCounter()
+    for chunk in read_csv_chunks(input_path, list(range(len(raw_columns))), list(sample.columns), chunksize=chunksize):
+        counter.update(chunk)
+    kept_columns = set(counter.columns_with_valid_share(EMPTY_THRESHOLD))
+    column_positions = [i for i, column in enumerate(sample.columns) if column in kept_columns]
+    column_names = [sample.columns[i] for i in column_positions]
+    sample = sample.iloc[:, column_positions]
+    removed_columns = original_sample.shape[1] - len(column_names)
+    process_times['Remove empty columns'] = time.time() - step_start_time
+    yield 0.1, "Removed empty columns"
+
+    # Text columns are read as text in every chunk, so a chunk that happens to hold only numbers parses the same way
+    text_columns = string_columns(sample).tolist()
+    string_dtypes = {raw_columns[i]: str for i, column in zip(column_positions, column_names) if column in text_columns}
+
+    def read_chunks():
+        return read_csv_chunks(input_path, column_positions, column_names, dtype=string_dtypes, chunksize=chunksize)
+
+    # Steps 3 and 4: Remove empty rows and count strings over the whole file
+    step_start_time = time.time()
+    counting_stats = {'rows': 0, 'empty_rows': 0}
+    value_counts = count_string_values(drop_empty_rows(read_chunks(), counting_stats), text_columns, counting_stats)
+    low_count_values = {column: counts.index[counts < 2] for column, counts in value_counts.items()}
+    value_counts = {column: counts[counts >= 2] for column, counts in value_counts.items()}
+    print(f"Counted values over {counting_stats['rows']} rows ({counting_stats['empty_rows']} empty rows).")
+    process_times['Remove empty rows and low count strings'] = time.time() - step_start_time
+    yield 0.3, "Removed empty rows and low count strings"
+
+    # Step 5: Decide how to clean each column from the sample, then apply it everywhere
+    sample = next(null_low_count_values(drop_empty_rows([sample], {'empty_rows': 0}), low_count_values))
+    decisions = {}
+    for i, column in enumerate(column_names):
+        column_start_time = time.time()
+        print(f"Cleaning column: {column}")
+        decisions[column] = decide_column(sample[column], column, value_counts=value_counts.get(column))
+        process_times[f"Clean column: {column}"] = time.time() - column_start_time
+        yield 0.3 + 0.3 * (i + 1) / len(column_names), f"Cleaning column: {column}"
+    cleaned_sample = next(apply_decisions([sample.copy()], decisions))
+
+    def cleaned_chunks(stats):
+        chunks = read_chunks()
+        chunks = drop_empty_rows(chunks, stats)
+        chunks = null_low_count_values(chunks, low_count_values)
+        return apply_decisions(chunks, decisions)
+
+    # Step 6: Remove outliers (IQR fences); one pass sketches the quartiles, the next filters chunks while writing
+    step_start_time = time.time()
+    numeric_columns = cleaned_sample.select_dtypes(include=[np.number]).columns.tolist()
+    sketches = {column: QuantileSketch() for column in numeric_columns}
+    for chunk in cleaned_chunks({'empty_rows': 0}):
+        for column in numeric_columns:
+            sketches[column].update(pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float, na_value=np.nan))
+    bounds = {column: iqr_bounds(sketch.quantile(0.25), sketch.quantile(0.75)) for column, sketch in sketches.items()}
+    print(f"Outlier bounds from quantile sketches (quartile rank error within {kll_rank_error():.2%}).")
+    yield 0.65, "Computed outlier bounds"
+
+    cleaned_sample = next(drop_outliers([cleaned_sample], bounds, {'outlier_rows': 0, 'outlier_cells': pd.Series(dtype='int64')}))
+    chunks = drop_outliers(cleaned_chunks(stats), bounds, stats)
+
+    rows_written = 0
+    total_rows = max(counting_stats['rows'], 1)
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows_written += len(chunk)
+        yield min(0.65 + 0.35 * rows_written / total_rows, 0.99), f"Wrote {rows_written} rows"
+    if rows_written == 0:
+        cleaned_sample.iloc[0:0].to_csv(output_path, index=False)
+    process_times['Remove outliers'] = time.time() - step_start_time
+
+    removed_rows = stats['empty_rows'] + stats['outlier_rows']
+    print(f"Removed {stats['outlier_rows']} rows containing outliers.")
+    outlier_cells = stats['outlier_cells']
+    for column, count in outlier_cells[outlier_cells > 0].items():
+        print(f"  {column}: {count} outlier cells")
+    print_inference_report()
+    print(f"Streaming cleaning completed: {rows_written} rows written to {output_path}")
+
+    yield 1.0, (output_path, original_sample, cleaned_sample, nonconforming_cells_before, process_times, removed_columns, removed_rows)
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+from type_inference import NULL_TOKENS
+
+
+def normalize_strings(values):
+    # Unicode NFKC, case folding and whitespace collapse in vectorized .str operations; values that normalize to a
+    # null token (see type_inference.NULL_TOKENS) become missing. Values that are not strings are kept as they are
+    values = pd.Series(values)
+    is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    if not is_text.any():
+        return values
+    text = values[is_text].astype(object)
+    normalized = (text.str.normalize('NFKC').str.casefold()
+                  .str.replace(r'\s+', ' ', regex=True).str.strip())
+    normalized = normalized.mask(normalized.isin(NULL_TOKENS), np.nan)
+    result = values.astype(object)
+    result[is_text] = normalized
+    return result
+
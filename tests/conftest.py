@@ -0,0 +1,33 @@
+import os
+import sys
+
+# Run the suite offline against the mock backend
+os.environ.setdefault('LLM_BACKEND', 'mock')
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import data_io
+from benchmark import make_dirty_dataset
+
+
+@pytest.fixture
+def dirty_frame():
+    return make_dirty_dataset(2000, 8, 600, 0.15, seed=3)
+
+
+@pytest.fixture
+def arrow_dirty_frame(dirty_frame):
+    # Same data as dirty_frame with Arrow dtypes, the way data_io reads files by default
+    text = dirty_frame.astype({c: str for c in dirty_frame.select_dtypes('object')}).replace('nan', None)
+    return data_io._to_pandas(pa.Table.from_pandas(text, preserve_index=False), True)
+
+
+def run_clean(df, **kwargs):
+    # Last state yielded by clean.clean_data
+    import clean
+    *_, (_, state) = clean.clean_data(df.copy(), **kwargs)
+    return state
@@ -0,0 +1,9 @@
+from conftest import run_clean
+
+
+def test_arrow_string_columns_keep_their_dtype(arrow_dirty_frame):
+    cleaned = run_clean(arrow_dirty_frame)[0]
+    text_columns = [column for column in cleaned.columns if column.startswith('label')]
+    assert text_columns
+    for column in text_columns:
+        assert cleaned[column].dtype == arrow_dirty_frame[column.replace('label_', 'Label ')].dtype
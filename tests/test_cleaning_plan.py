@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from cleaning_plan import CleaningPlan
+
+
+def test_known_values_survive_a_reload(tmp_path):
+    column = pd.Series([1, 2, True, np.int64(3), pd.Timestamp('2024-01-01'), 'x'] * 20, dtype=object)
+    plan = CleaningPlan()
+    plan.record_column('code', {'data_type': 'object'}, column, column)
+    path = str(tmp_path / 'plan.json')
+    plan.save(path)
+
+    reloaded = CleaningPlan.load(path)
+    assert reloaded.drift('code', column, column) == 0
+    changed = column.where(column.index % 6 != 5, 'y')
+    assert reloaded.drift('code', changed, changed) == 20 / 120
@@ -0,0 +1,17 @@
+import pytest
+
+import cli
+
+
+@pytest.mark.parametrize('flags, expected', [([], False), (['--optimize-dtypes'], True),
+                                             (['--no-optimize-dtypes'], False)])
+def test_optimize_dtypes_flag(monkeypatch, flags, expected):
+    monkeypatch.setattr(cli, 'OPTIMIZE_DTYPES', False)
+    args = cli.build_parser().parse_args(['clean', 'input.csv', 'out'] + flags)
+    assert args.optimize_dtypes is expected
+
+
+def test_optimize_dtypes_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(cli, 'OPTIMIZE_DTYPES', True)
+    assert cli.build_parser().parse_args(['clean', 'input.csv', 'out']).optimize_dtypes is True
+    assert cli.build_parser().parse_args(['clean', 'input.csv', 'out', '--no-optimize-dtypes']).optimize_dtypes is False
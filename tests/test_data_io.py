@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+import data_io
+
+pytest.importorskip('pyarrow')
+
+CSV = '''name,city,score,note,blank
+Ann,"",1.5,NA,
+Bob,Paris,,None,
+"",N/A,2.0,"ok",
+Cid,null,3.5,<NA>,
+'''
+
+
+@pytest.mark.parametrize('arrow_dtypes', [False, True])
+def test_arrow_csv_nulls_match_pandas(tmp_path, arrow_dtypes):
+    path = tmp_path / 'input.csv'
+    path.write_text(CSV)
+    expected = pd.read_csv(path)
+    df = data_io.read_table(str(path), arrow_dtypes=arrow_dtypes)
+    assert list(df.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(df.isna(), expected.isna())
+    for column in expected.columns:
+        assert df[column].dropna().tolist() == expected[column].dropna().tolist()
@@ -0,0 +1,15 @@
+import pandas as pd
+
+import clean
+
+
+def test_free_text_columns_are_still_normalized_locally(monkeypatch):
+    monkeypatch.setattr(clean, 'STRING_NORMALIZATION', 'local')
+    values = [f"Item  {i}" for i in range(80)] + ['N/A', 'null', ' Item 3 ']
+    column = pd.Series(values, name='notes')
+    decisions = clean.decide_column(column, 'notes')
+    assert decisions['normalize'] and not decisions['transform'] and not decisions['low_count_values']
+    cleaned, _ = clean.apply_column_decisions(column, decisions)
+    assert cleaned.iloc[0] == 'item 0'
+    assert cleaned.iloc[80:82].isna().all()
+    assert cleaned.iloc[82] == 'item 3'
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+import clean
+
+
+def test_public_step_wrappers():
+    df = pd.DataFrame({
+        'name': ['a', 'a', 'b', 'a', None, 'c'],
+        'score': [1.0, 2.0, 3.0, np.nan, np.nan, 4.0],
+        'empty': [np.nan, np.nan, np.nan, np.nan, 1.0, np.nan],
+    })
+    assert list(clean.remove_empty_columns(df).columns) == ['name', 'score']
+    assert list(clean.remove_empty_rows(df[['name', 'score']]).index) == [0, 1, 2, 3, 5]
+    masked = clean.remove_low_count_categories(df)
+    assert masked['name'].isna().tolist() == [False, False, True, False, True, True]
+    assert df['name'].notna().sum() == 5
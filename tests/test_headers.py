@@ -0,0 +1,17 @@
+import pandas as pd
+
+import clean
+import metrics
+import prompt_builder
+
+
+def test_skipped_header_stages_are_reported(monkeypatch, capsys):
+    metrics.reset()
+    monkeypatch.setattr(prompt_builder, 'PROMPT_MAX_REQUESTS', 1)
+    # Column names well past one prompt's token budget
+    names = [f"Measurement Of Something Quite Long {i}" for i in range(4000)]
+    df = pd.DataFrame([range(len(names))], columns=names)
+    df = clean.check_and_normalize_column_headers(df)
+    assert df.columns[0] == 'measurement_of_something_quite_long_0'
+    assert 'to check the headers with the LLM, skipped' in capsys.readouterr().out
+    assert metrics.counter_value('llm_stages_skipped_total', reason='too_many_requests') == 2
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+import clean
+import llm_config
+from llm_cache import LLMCache
+
+
+class ScriptedBackend:
+    # Answers prompts with the given responses in turn
+    def __init__(self, responses):
+        self.model = 'scripted'
+        self.retryable_errors = ()
+        self.responses = list(responses)
+        self.requests = 0
+
+    def complete(self, prompt):
+        self.requests += 1
+        return self.responses.pop(0), None
+
+
+@pytest.fixture
+def cached_backend(tmp_path, monkeypatch):
+    def use(responses):
+        backend = ScriptedBackend(responses)
+        monkeypatch.setattr(llm_config, 'backend', backend)
+        return backend
+    monkeypatch.setattr(llm_config, 'CACHE_DISABLED', False)
+    monkeypatch.setattr(llm_config, '_cache', LLMCache(path=str(tmp_path / 'cache.sqlite')))
+    return use
+
+
+def test_unparsable_responses_are_not_served_from_the_cache(cached_backend):
+    column = pd.Series(['a', 'a', 'b'])
+    backend = cached_backend(['not json', '["b"]'])
+    assert clean.check_low_count_values(column, 'letters') == []
+    assert clean.check_low_count_values(column, 'letters') == ['b']
+    assert clean.check_low_count_values(column, 'letters') == ['b']
+    assert backend.requests == 2
+
+
+def test_unparsable_column_batches_are_asked_again(cached_backend):
+    batch = pd.Series(['1', '2', 'x'])
+    backend = cached_backend(['{"empty_indices": []}',
+                              '{"data_type": "integer", "empty_indices": [], "invalid_indices": [2]}'])
+    assert clean.process_column_batch(batch, 'numbers')['invalid_indices'] == []
+    assert clean.process_column_batch(batch, 'numbers')['invalid_indices'] == [2]
+    assert clean.process_column_batch(batch, 'numbers')['invalid_indices'] == [2]
+    assert backend.requests == 2
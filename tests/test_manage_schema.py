@@ -0,0 +1,12 @@
+import pandas as pd
+
+from manage_schema import determine_column_type, process_dataframe
+
+
+def test_sniffed_date_format_is_used():
+    df = pd.DataFrame({'day': ['13/01/2024', '02/03/2024', '25/12/2023', '07/04/2024'] * 5})
+    column_type, invalid_indices, date_format = determine_column_type(df, 'day')
+    assert (column_type, invalid_indices, date_format) == ('date', [], '%d/%m/%Y')
+    dates = process_dataframe(df.copy())['day']
+    assert dates.iloc[1] == pd.Timestamp('2024-03-02')
+    assert dates.notna().all()
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+import clean
+
+
+def test_zero_mad_falls_back_to_mean_absolute_deviation():
+    df = pd.DataFrame({'value': [0.0] * 80 + [1.0, 2.0, -1.0, 1.5] * 5})
+    df.loc[len(df)] = 500.0
+    mask, counts = clean.outlier_masks(df, clean.compute_outlier_bounds(df, method='mad'))
+    assert mask.sum() == 1 and mask[-1]
+    assert counts['value'] == 1
+
+
+def test_constant_columns_have_no_outliers():
+    df = pd.DataFrame({'ratio': [0.1] * 1000, 'count': np.ones(1000, dtype=int)})
+    for method in ('iqr', 'zscore', 'mad'):
+        cleaned, removed = clean.remove_outliers(df, method=method)
+        assert removed == 0
+        assert len(cleaned) == len(df)
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+import clean
+from conftest import run_clean
+
+
+@pytest.mark.parametrize('frame', ['dirty_frame', 'arrow_dirty_frame'])
+def test_packed_batches_match_unpacked(frame, request, monkeypatch):
+    df = request.getfixturevalue(frame)
+    monkeypatch.setattr(clean, 'PACK_COLUMN_BATCHES', False)
+    unpacked = run_clean(df)
+    monkeypatch.setattr(clean, 'PACK_COLUMN_BATCHES', True)
+    packed = run_clean(df)
+    pd.testing.assert_frame_equal(packed[0], unpacked[0])
+    assert packed[1] == unpacked[1]
+
+
+def test_packed_batch_keys_are_unique(dirty_frame, monkeypatch):
+    packed_items = []
+    pack_batches = clean.pack_batches
+
+    def recording_pack_batches(items, token_budget):
+        packed_items.extend(items)
+        return pack_batches(items, token_budget)
+
+    monkeypatch.setattr(clean, 'PACK_COLUMN_BATCHES', True)
+    monkeypatch.setattr(clean, 'pack_batches', recording_pack_batches)
+    run_clean(dirty_frame)
+    keys = [key for key, _, _, _ in packed_items]
+    assert len(keys) > len({column for _, column, _, _ in packed_items})
+    assert len(keys) == len(set(keys))
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from profiler import profile_frame
+
+
+def test_value_counts_are_per_column():
+    df = pd.DataFrame({
+        'code': pd.Series([1, 0, 1, 'x', None], dtype=object),
+        'flag': pd.Series([True, False, True, True, ''], dtype=object),
+        'ratio': pd.Series([1.0, 'a', ' ', 'a', np.nan], dtype=object),
+    })
+    profile = profile_frame(df)
+    counts = profile['value_counts']
+    assert list(counts['code'].index) == [1, 0, 'x'] and list(counts['code']) == [2, 1, 1]
+    assert list(counts['flag'].index) == [True, False, ''] and list(counts['flag']) == [3, 1, 1]
+    assert list(counts['ratio'].index) == [1.0, 'a', ' ']
+    assert all(type(value) is bool for value in counts['flag'].index[:2])
+    assert type(counts['code'].index[0]) is int
+    assert profile['nan'].tolist() == [1, 0, 1]
+    assert profile['empty'].tolist() == [0, 1, 0]
+    assert profile['whitespace'].tolist() == [0, 0, 1]
+    assert profile['distinct'].tolist() == [3, 3, 3]
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('seaborn')
+
+import matplotlib.image as mpimg
+
+from benchmark import make_dirty_dataset
+from report import create_full_report
+
+
+def render(report_dir, **kwargs):
+    df = make_dirty_dataset(300, 4, 10, 0.1, seed=5)
+    cleaned = df.dropna()
+    return create_full_report(df, cleaned, {column: 1 for column in df.columns}, {'Step': 1.0}, [], len(df) - len(cleaned),
+                              report_dir=str(report_dir), workers=1, **kwargs)
+
+
+def test_report_uses_the_requested_format(tmp_path):
+    paths = render(tmp_path, fmt='svg')
+    assert paths and all(path.endswith('.svg') for path in paths)
+
+
+def test_report_uses_the_requested_dpi(tmp_path):
+    low = render(tmp_path / 'low', dpi=40)
+    high = render(tmp_path / 'high', dpi=80)
+    for low_path, high_path in zip(low, high):
+        low_height, high_height = mpimg.imread(low_path).shape[0], mpimg.imread(high_path).shape[0]
+        assert high_height > 1.5 * low_height
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import clean
+from frame_selection import FrameSelection
+from shared_frames import share_frame, open_shared_frame, close_shared_frame, release_shared_frame
+
+
+def test_shared_frame_round_trip(arrow_dirty_frame):
+    df = arrow_dirty_frame.head(500)
+    handle, block = share_frame(df)
+    try:
+        frame, worker_block = open_shared_frame(handle)
+        pd.testing.assert_frame_equal(frame, df)
+        del frame
+        close_shared_frame(worker_block)
+        assert worker_block.buf is None
+    finally:
+        release_shared_frame(block)
+
+
+def test_abandoned_workers_release_every_block(arrow_dirty_frame, monkeypatch):
+    shared, released = [], []
+
+    def recording_share_frame(df):
+        handle, block = share_frame(df)
+        shared.append(block.name)
+        return handle, block
+
+    def recording_release_shared_frame(block):
+        released.append(block.name)
+        release_shared_frame(block)
+
+    monkeypatch.setattr(clean, 'share_frame', recording_share_frame)
+    monkeypatch.setattr(clean, 'release_shared_frame', recording_release_shared_frame)
+    selection = FrameSelection(arrow_dirty_frame.head(200))
+    results = clean.clean_columns_in_workers(selection, list(selection.columns), {}, workers=2)
+    next(results)
+    results.close()
+    assert len(shared) > 1
+    assert sorted(released) == sorted(shared)
@@ -0,0 +1,30 @@
+import warnings
+
+import pandas as pd
+
+from benchmark import make_dirty_dataset
+from stream import clean_csv_streaming
+from conftest import run_clean
+
+
+def run_streaming(input_path, output_path, **kwargs):
+    *_, (_, state) = clean_csv_streaming(str(input_path), str(output_path), **kwargs)
+    return state
+
+
+def test_streaming_writes_chunks_without_copy_warnings(tmp_path):
+    input_path, output_path = tmp_path / 'input.csv', tmp_path / 'output.csv'
+    make_dirty_dataset(3000, 6, 30, 0.15, seed=4).to_csv(input_path, index=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.SettingWithCopyWarning)
+        run_streaming(input_path, output_path, chunksize=500, sample_rows=1000)
+    assert len(pd.read_csv(output_path)) > 0
+
+
+def test_streaming_matches_in_memory_cleaning(tmp_path):
+    # With the sample covering the whole file, both paths make the same decisions and find the same outliers
+    input_path, output_path, memory_path = tmp_path / 'input.csv', tmp_path / 'streamed.csv', tmp_path / 'memory.csv'
+    make_dirty_dataset(3000, 6, 30, 0.15, seed=4).to_csv(input_path, index=False)
+    run_streaming(input_path, output_path, chunksize=700, sample_rows=5000)
+    run_clean(pd.read_csv(input_path))[0].to_csv(memory_path, index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path), pd.read_csv(memory_path))
@@ -0,0 +1,18 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from value_index import ColumnIndex
+
+
+@pytest.mark.parametrize('dtype', [object, 'string[pyarrow]', 'Int64', 'float64'])
+def test_take_round_trips_without_warnings(dtype):
+    values = [1, None, 2, 1] if dtype in ('Int64', 'float64') else ['a', None, 'b', 'a']
+    column = pd.Series(values, dtype=dtype, name='column')
+    index = ColumnIndex.from_column(column)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        restored = index.to_series()
+    assert restored.isna().tolist() == column.isna().tolist()
+    assert restored.dropna().tolist() == column.dropna().tolist()
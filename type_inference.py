@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Share of non-empty rows that must parse as a type for it to be decided without the LLM
+CONFIDENCE_THRESHOLD = 0.999
+
+# Cell values treated as blanks (compared case-insensitively after stripping whitespace)
+NULL_TOKENS = {'', 'nan', 'none', 'null', 'n/a', 'na'}
+
+INTEGER_PATTERN = r'^[+-]?\d+$'
+LEADING_ZERO_PATTERN = r'^[+-]?0\d'
+DATE_PATTERN = r'^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$'
+
+# Candidate formats for date sniffing, tried in order; the first one that parses best wins
+DATE_FORMATS = ['ISO8601', '%d/%m/%Y', '%m/%d/%Y', '%d.%m.%Y', '%d-%m-%Y', '%m-%d-%Y', '%Y/%m/%d',
+                '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S']
+
+inference_stats = {'columns_inferred': 0, 'columns_sent_to_llm': 0, 'llm_calls_avoided': 0}
+
+
+def reset_inference_stats():
+    for key in inference_stats:
+        inference_stats[key] = 0
+
+
+def merge_inference_stats(stats):
+    # Fold in counts gathered by a worker process
+    for key, value in stats.items():
+        inference_stats[key] += value
+
+
+def record_inference(inferred, llm_calls):
+    if inferred:
+        inference_stats['columns_inferred'] += 1
+        inference_stats['llm_calls_avoided'] += llm_calls
+    else:
+        inference_stats['columns_sent_to_llm'] += 1
+
+
+def print_inference_report():
+    print(f"Local type inference: {inference_stats['columns_inferred']} columns decided locally, "
+          f"{inference_stats['columns_sent_to_llm']} sent to the LLM, "
+          f"{inference_stats['llm_calls_avoided']} LLM calls avoided")
+
+
+def _weighted_ratio(mask, weights, total):
+    return weights[mask].sum() / total if total else 0.0
+
+
+def _sniff_date_format(text, weights, total):
+    best_format, best_parsed, best_ratio = None, None, 0.0
+    for date_format in DATE_FORMATS:
+        parsed = pd.to_datetime(text, format=date_format, errors='coerce')
+        ratio = _weighted_ratio(parsed.notna().to_numpy(), weights, total)
+        if ratio > best_ratio:
+            best_format, best_parsed, best_ratio = date_format, parsed, ratio
+        if ratio == 1.0:
+            break
+    # When the day-first and month-first reading parse as many values (01/02/2020), the order is a guess: ambiguous
+    swapped = _swap_day_month(best_format) if best_format is not None else None
+    if swapped != best_format and swapped in DATE_FORMATS:
+        parsed = pd.to_datetime(text, format=swapped, errors='coerce')
+        if _weighted_ratio(parsed.notna().to_numpy(), weights, total) == best_ratio:
+            return None, None, 0.0
+    return best_format, best_parsed, best_ratio
+
+
+def _swap_day_month(date_format):
+    return date_format.replace('%d', '\0').replace('%m', '%d').replace('\0', '%m')
+
+
+def infer_column_type(uniques, counts):
+    # Decide the column type from its unique values and their counts, or return None when it is ambiguous
+    if pd.api.types.is_bool_dtype(uniques.dtype):
+        return None
+    no_flags = np.zeros(len(uniques), dtype=bool)
+    if pd.api.types.is_datetime64_any_dtype(uniques.dtype):
+        return {'data_type': 'date', 'date_format': None, 'empty_values': no_flags, 'invalid_values': no_flags}
+    if pd.api.types.is_integer_dtype(uniques.dtype):
+        return {'data_type': 'integer', 'date_format': None, 'empty_values': no_flags, 'invalid_values': no_flags}
+    if pd.api.types.is_float_dtype(uniques.dtype):
+        return {'data_type': 'float', 'date_format': None, 'empty_values': no_flags, 'invalid_values': no_flags}
+
+    text = uniques.astype(str).str.strip()
+    empty_values = text.str.lower().isin(NULL_TOKENS).to_numpy()
+    weights = np.where(empty_values, 0, counts)
+    total = weights.sum()
+    if total == 0:
+        return None
+
+    numeric = pd.to_numeric(text.where(~empty_values), errors='coerce')
+    parsed = numeric.notna().to_numpy() & np.isfinite(numeric.to_numpy(dtype=float, na_value=np.nan))
+    if _weighted_ratio(parsed, weights, total) >= CONFIDENCE_THRESHOLD:
+        # Zero-padded codes (zip codes, IDs) would lose their padding as numbers, so leave them to the LLM
+        if (text.str.match(LEADING_ZERO_PATTERN).to_numpy() & parsed).any():
+            return None
+        is_integer = text.str.match(INTEGER_PATTERN).to_numpy()
+        data_type = 'integer' if is_integer[parsed].all() else 'float'
+        return {'data_type': data_type, 'date_format': None, 'empty_values': empty_values,
+                'invalid_values': ~parsed & ~empty_values}
+
+    looks_like_date = text.str.match(DATE_PATTERN).to_numpy()
+    if _weighted_ratio(looks_like_date, weights, total) >= CONFIDENCE_THRESHOLD:
+        date_format, dates, ratio = _sniff_date_format(text.where(looks_like_date), weights, total)
+        if ratio >= CONFIDENCE_THRESHOLD:
+            parsed = dates.notna().to_numpy()
+            return {'data_type': 'date', 'date_format': date_format, 'empty_values': empty_values,
+                    'invalid_values': ~parsed & ~empty_values}
+
+    return None
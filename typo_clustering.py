@@ -0,0 +1,183 @@
+import unicodedata
+import numpy as np
+import pandas as pd
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+# Values closer than this (edits, and edits per character of the shorter value) are candidates for the same cluster
+TYPO_MAX_EDITS = 2
+TYPO_MAX_EDIT_RATIO = 0.2
+TYPO_MIN_LENGTH = 4
+
+# MinHash over character trigrams, split into bands of rows; values sharing any band are compared
+NGRAM_SIZE = 3
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+MINHASH_SEED = 42
+# Larger buckets (very common trigram sets) are not compared pairwise
+MAX_BUCKET_SIZE = 50
+# Least share of equal hashes for a pair to be compared; one edit in a five character value keeps about 0.375
+MIN_SIMILARITY = 0.15
+
+_PRIME = (1 << 31) - 1
+
+
+def _strip_accents(values):
+    # Combining marks removed after NFKD; other characters, including non-Latin letters, are kept
+    return values.str.normalize('NFKD').map(lambda value: ''.join(char for char in value
+                                                                  if not unicodedata.combining(char)))
+
+
+def variant_keys(values):
+    # Values that differ only in case, accents or spacing are the same value written differently
+    return _strip_accents(values).str.casefold().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def fingerprints(values):
+    # Key-collision fingerprint: case, accents, punctuation, spacing and token order removed
+    keys = _strip_accents(values.str.lower()).str.replace(r'[^\w\s]', '', regex=True)
+    return keys.str.split().map(lambda tokens: ' '.join(sorted(set(tokens))))
+
+
+def edit_distance(a, b, max_distance):
+    # Levenshtein distance, or max_distance + 1 once it is certain to exceed max_distance
+    if Levenshtein is not None:
+        return Levenshtein.distance(a, b, score_cutoff=max_distance)
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # Only cells within max_distance of the diagonal can stay within max_distance
+    too_far = max_distance + 1
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]), too_far)
+        if min(current[low - 1:high + 1]) > max_distance:
+            return too_far
+        previous = current
+    return previous[-1]
+
+
+def minhash_signatures(texts, num_hashes=MINHASH_BANDS * MINHASH_ROWS, ngram_size=NGRAM_SIZE, seed=MINHASH_SEED):
+    # One row of num_hashes minimum trigram hashes per text, from a single hashing pass over all trigrams
+    padded = [f" {text} " for text in texts]
+    grams = [text[i:i + ngram_size] for text in padded for i in range(max(len(text) - ngram_size + 1, 1))]
+    lengths = np.array([max(len(text) - ngram_size + 1, 1) for text in padded])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    hashes = (pd.util.hash_array(np.array(grams, dtype=object)) % _PRIME).astype(np.int64)
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_hashes)
+    b = rng.integers(0, _PRIME, size=num_hashes)
+    signatures = np.empty((len(texts), num_hashes), dtype=np.int64)
+    for k in range(num_hashes):
+        signatures[:, k] = np.minimum.reduceat((a[k] * hashes + b[k]) % _PRIME, starts)
+    return signatures
+
+
+def candidate_pairs(signatures, bands=MINHASH_BANDS, rows=MINHASH_ROWS, max_bucket_size=MAX_BUCKET_SIZE,
+                    min_similarity=MIN_SIMILARITY):
+    # Pairs of positions whose signatures agree on every row of at least one band and on at least min_similarity
+    # of all their hashes (an estimate of the trigram Jaccard similarity), as an array of shape (pairs, 2)
+    pairs = set()
+    for band in range(bands):
+        keys = signatures[:, band * rows] * _PRIME + signatures[:, band * rows + 1:(band + 1) * rows].sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(keys[order])) + 1, [len(keys)]])
+        sizes = np.diff(bounds)
+        kept = (sizes >= 2) & (sizes <= max_bucket_size)
+        for start, size in zip(bounds[:-1][kept], sizes[kept]):
+            bucket = order[start:start + size].tolist()
+            pairs.update((i, j) for n, i in enumerate(bucket) for j in bucket[n + 1:])
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.array(sorted(pairs), dtype=np.int64)
+    # Pairs that met in one band by chance share few of the other hashes
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    return pairs[similarity >= min_similarity]
+
+
+class _DisjointSet:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        self.parent[self.find(i)] = self.find(j)
+
+
+def cluster_values(values, counts):
+    # Groups near-duplicate strings. Variants differing only in case, accents or spacing are mapped to the most
+    # frequent way of writing them; the values that remain are clustered by fingerprint collisions and MinHash
+    # candidates within TYPO_MAX_EDITS. Those clusters may hold distinct values ("c++" and "c", "karin" and "karen"),
+    # so they are left to the LLM. Returns (mapping of variant -> canonical value, ambiguous clusters), where each
+    # ambiguous cluster is a list of (value, count), most frequent first
+    values = pd.Series(values, dtype=object).reset_index(drop=True)
+    counts = np.asarray(counts)
+    # Only values with letters are clustered: numbers and codes one digit apart are different values, not typos
+    is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    has_letters = values[is_text].str.contains(r'[^\W\d_]').reindex(values.index, fill_value=False).to_numpy(dtype=bool)
+    positions = np.flatnonzero(has_letters & (counts > 0))
+    if len(positions) < 2:
+        return {}, []
+    texts = values.iloc[positions].reset_index(drop=True)
+    counts = counts[positions]
+
+    # Each group of variants is represented by its most frequent member, with the counts of the whole group
+    variant_codes, _ = pd.factorize(variant_keys(texts))
+    by_count = np.lexsort((-counts, variant_codes))
+    firsts = np.concatenate([[True], np.diff(variant_codes[by_count]) != 0])
+    heads = by_count[firsts]
+    head_of = heads[np.cumsum(firsts) - 1]
+    mapping = {texts[member]: texts[head] for member, head in zip(by_count.tolist(), head_of.tolist()) if member != head}
+    group_counts = np.bincount(variant_codes, weights=counts)[variant_codes[heads]].astype(np.int64)
+    if len(heads) < 2:
+        return mapping, []
+    texts = texts.iloc[heads].reset_index(drop=True)
+    counts = group_counts
+    keys = fingerprints(texts)
+    digits = texts.str.replace(r'\D', '', regex=True)
+
+    clusters = _DisjointSet(len(texts))
+    # Token order is ignored, but the digits must come in the same order ("Suite 12 Apt 3" is not "Suite 3 Apt 12")
+    key_codes, _ = pd.factorize(keys + '|' + digits)
+    digits = digits.tolist()
+    first_with_key = {}
+    for i, code in enumerate(key_codes):
+        if code in first_with_key:
+            clusters.union(i, first_with_key[code])
+        else:
+            first_with_key[code] = i
+
+    # Edit distance is measured between fingerprints, so case and spacing differences cost nothing
+    key_list = keys.tolist()
+    long_enough = np.flatnonzero(keys.str.len().to_numpy() >= TYPO_MIN_LENGTH)
+    if len(long_enough) >= 2:
+        signatures = minhash_signatures([key_list[i] for i in long_enough])
+        for i, j in candidate_pairs(signatures).tolist():
+            i, j = long_enough[i], long_enough[j]
+            if key_codes[i] == key_codes[j] or digits[i] != digits[j]:
+                continue
+            max_edits = min(TYPO_MAX_EDITS, int(TYPO_MAX_EDIT_RATIO * min(len(key_list[i]), len(key_list[j]))))
+            if max_edits and edit_distance(key_list[i], key_list[j], max_edits) <= max_edits:
+                clusters.union(i, j)
+
+    roots = np.array([clusters.find(i) for i in range(len(texts))])
+    # Members of each cluster, most frequent first
+    order = np.lexsort((-counts, roots))
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(roots[order])) + 1, [len(roots)]])
+    ambiguous = [[(texts[i], int(counts[i])) for i in order[start:end]]
+                 for start, end in zip(bounds[:-1], bounds[1:]) if end - start >= 2]
+    return mapping, ambiguous
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from pandas.arrays import ArrowExtensionArray
+
+
+def factorize_column(column_data):
+    # Per-row codes into the column's unique values (-1 for missing), plus how often each value occurs
+    codes, uniques = pd.factorize(column_data)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return codes, pd.Series(uniques), counts
+
+
+def values_by_frequency(counts):
+    # Positions of the unique values, most frequent first (ties keep first-seen order)
+    return np.argsort(-counts, kind='stable')
+
+
+def valid_positions(indices, batch_positions):
+    # Map LLM indices within a batch back to positions in the unique values, dropping anything out of range
+    batch_size = len(batch_positions)
+    indices = [idx for idx in indices if isinstance(idx, int) and 0 <= idx < batch_size]
+    return batch_positions[indices]
+
+
+def rows_matching(codes, value_mask):
+    # Vectorized join of per-value verdicts back onto every row; missing values never match
+    if len(value_mask) == 0:
+        return np.zeros(len(codes), dtype=bool)
+    return (codes >= 0) & value_mask[np.maximum(codes, 0)]
+
+
+class ColumnIndex:
+    # A column as codes into its distinct values plus their counts, built once per column and consulted by the
+    # cleaning steps. Lookups, string mappings and masks run on the distinct values and reach the rows by code. It
+    # stands in for the Series in the value_counts(), unique() and sample() calls of the LLM checks. Missing rows
+    # have code -1 (missing in the source column, shown as they are there) or -2 (made missing by mask or
+    # map_values, shown as nan)
+
+    def __init__(self, index, name, codes, uniques, counts, source=None):
+        self.index = index
+        self.name = name
+        self.codes = codes
+        self.uniques = uniques
+        self.counts = counts
+        self.source = source
+
+    @classmethod
+    def from_column(cls, column_data):
+        codes, uniques, counts = factorize_column(column_data)
+        return cls(column_data.index, column_data.name, codes, uniques, counts, column_data)
+
+    @classmethod
+    def from_counts(cls, column_data, value_counts):
+        # Built from counts taken already (see profiler.profile_frame): the rows are looked up in the distinct values
+        # rather than counted again. Counts that no longer match the column are not used
+        value_counts = value_counts[value_counts > 0]
+        codes = pd.Index(value_counts.index).get_indexer(column_data)
+        found = codes >= 0
+        if found.sum() != value_counts.sum():
+            return cls.from_column(column_data)
+        # Renumbered in first-seen order, as factorize numbers them
+        first_rows = np.full(len(value_counts), len(codes))
+        np.minimum.at(first_rows, codes[found], np.flatnonzero(found))
+        order = np.argsort(first_rows, kind='stable')
+        renumber = np.empty(len(order), dtype=codes.dtype)
+        renumber[order] = np.arange(len(order))
+        codes[found] = renumber[codes[found]]
+        uniques = pd.Series(value_counts.index.to_numpy()[order], dtype=column_data.dtype)
+        return cls(column_data.index, column_data.name, codes, uniques, value_counts.to_numpy(dtype=np.int64)[order],
+                   column_data)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def rows(self, value_mask):
+        return rows_matching(self.codes, value_mask)
+
+    def isin(self, values):
+        # Same rows as Series.isin, which also matches missing rows when values holds a missing value
+        values = list(values)
+        rows = self.rows(self.uniques.isin(values).to_numpy(dtype=bool))
+        if pd.isna(pd.Series(values, dtype=object)).any():
+            rows |= self.codes < 0
+        return rows
+
+    def value_counts(self):
+        # Same order as Series.value_counts: by count, ties in first-seen order
+        live = self.counts > 0
+        # Arrow-backed columns count into Arrow integers, whose sort keeps ties in order
+        dtype = 'int64[pyarrow]' if isinstance(self.uniques.array, ArrowExtensionArray) else 'int64'
+        return pd.Series(self.counts[live], index=pd.Index(self.uniques[live]), dtype=dtype).sort_values(ascending=False)
+
+    def values_at(self, positions):
+        codes = self.codes[positions]
+        values = np.empty(len(codes), dtype=object)
+        if len(self.uniques):
+            values[:] = self.uniques.to_numpy(dtype=object)[np.maximum(codes, 0)]
+        values[codes == -2] = np.nan
+        from_source = codes == -1
+        if from_source.any():
+            values[from_source] = self.source.iloc[positions[from_source]].to_numpy(dtype=object)
+        return values
+
+    def unique(self):
+        # Same values in the same order as Series.unique, including each kind of missing value (nan, None, <NA>)
+        live = np.flatnonzero(self.counts > 0)
+        # Codes are numbered in first-seen order, so a running maximum finds each value's first row
+        first_rows = np.searchsorted(np.maximum.accumulate(self.codes), live)
+        values = list(self.uniques.to_numpy(dtype=object)[live])
+        missing_rows = np.flatnonzero(self.codes < 0)
+        if len(missing_rows):
+            missing_values = self.values_at(missing_rows)
+            if len(pd.unique(missing_values)) == 1:
+                kinds_first = np.array([0])
+            else:
+                _, kinds_first = np.unique(pd.factorize(pd.Series(missing_values).map(type))[0], return_index=True)
+            for position in sorted(kinds_first, reverse=True):
+                values.insert(int((first_rows < missing_rows[position]).sum()), missing_values[position])
+        return pd.Series(values, dtype=object).to_numpy()
+
+    def sample(self, n, random_state=None):
+        # Picks the same rows as Series.sample
+        positions = pd.Series(np.arange(len(self.codes))).sample(n=n, random_state=random_state).to_numpy()
+        return pd.Series(self.values_at(positions), dtype=object)
+
+    def mask(self, value_mask):
+        # The column with the rows of the masked values set to missing
+        codes = np.where(self.rows(value_mask), -2, self.codes)
+        counts = np.where(value_mask, 0, self.counts)
+        return ColumnIndex(self.index, self.name, codes, self.uniques, counts, self.source)
+
+    def map_values(self, new_values):
+        # The column with every distinct value replaced by the value at the same position of new_values; values
+        # that map to the same result are merged, missing results make their rows missing
+        live = np.flatnonzero(self.counts > 0)
+        live_codes, uniques = pd.factorize(pd.Series(new_values).iloc[live])
+        mapping = np.full(len(self.uniques), -2, dtype=np.intp)
+        mapping[live] = np.where(live_codes >= 0, live_codes, -2)
+        codes = self.codes.copy()
+        codes[codes >= 0] = mapping[codes[codes >= 0]]
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return ColumnIndex(self.index, self.name, codes, pd.Series(uniques), counts, self.source)
+
+    def take(self, values):
+        # Rows of values given per distinct value (e.g. the distinct values converted to numbers); missing rows get
+        # the array's missing value
+        array = values.array if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+        if isinstance(array, pd.arrays.NumpyExtensionArray):
+            # take wants a plain ndarray for numpy-backed values, real extension arrays are passed as they are
+            array = array.to_numpy()
+        return pd.Series(pd.api.extensions.take(array, np.maximum(self.codes, -1), allow_fill=True),
+                         index=self.index, name=self.name)
+
+    def to_series(self):
+        return self.take(self.uniques)